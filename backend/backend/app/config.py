@@ -25,6 +25,17 @@ class Settings(BaseSettings):
     bedrock_agent_alias_id: Optional[str] = None
     bedrock_max_iterations: int = 15
     bedrock_timeout_seconds: int = 300
+    bedrock_latency_optimized: bool = False
+    bedrock_connect_timeout: int = 5
+    bedrock_read_timeout: int = 60
+    bedrock_max_attempts: int = 2
+    enable_hedged_bedrock: bool = False
+    playwright_pool_size: int = 2
+    playwright_qr_pool_size: int = 2
+    playwright_prewarm: bool = True
+    bill_cache_ttl_seconds: int = 300
+    bill_cache_max_entries: int = 2048
+    bill_cache_dir: Optional[str] = None
     
     # Utility Portal URLs
     kseb_url: str = "https://johansansebastian.github.io/oneway_sites/kseb/"
@@ -36,6 +47,7 @@ class Settings(BaseSettings):
     api_host: str = "0.0.0.0"
     api_port: int = 8000
     debug: bool = False
+    use_uvloop: bool = True
     
     # Logging
     log_level: str = "INFO"
@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.routers import auth, utilities, profiles, payments, sentinel, disaster
 from app.config import settings
+from app.services.navigator import close_async_runtime_client, close_http_client, warm_browser_pool
 
 # Configure logging
 logging.basicConfig(
@@ -45,10 +46,14 @@ async def lifespan(app: FastAPI):
     else:
         logger.info("AWS credentials resolved from default credential chain")
     
+    await warm_browser_pool()
+    
     yield
     
     # Shutdown
     logger.info("OneWay API shutting down...")
+    await close_http_client()
+    await close_async_runtime_client()
 
 
 app = FastAPI(
@@ -86,3 +91,16 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Playwright's sync API stays on executor threads, so it never touches uvloop.
+    # USE_UVLOOP only governs this entry point; the uvicorn CLI takes --loop.
+    uvicorn.run(
+        "app.main:app",
+        host=settings.api_host,
+        port=settings.api_port,
+        loop="uvloop" if settings.use_uvloop else "asyncio",
+    )
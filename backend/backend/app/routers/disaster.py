@@ -28,7 +28,7 @@ from app.database import (
     get_disaster_incident_stats
 )
 from app.services.disaster_engine import get_disaster_engine
-from app.services.kerala_authorities import KeralaAuthorityDirectory
+from app.services.kerala_authorities import get_authority_directory
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/disaster", tags=["Disaster Sentinel"])
@@ -38,7 +38,7 @@ INCIDENTS_DIR = Path(__file__).resolve().parent.parent / "incidents"
 INCIDENTS_DIR.mkdir(exist_ok=True)
 
 # Initialize authority directory
-authority_directory = KeralaAuthorityDirectory()
+authority_directory = get_authority_directory()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from app.models import PaymentRequest, PaymentResponse, ServiceType
-from app.services.navigator import UtilityNavigator
+from app.services.navigator import UtilityNavigator, QRCaptureBusyError
 import uuid
 from functools import lru_cache
 
@@ -29,6 +29,8 @@ async def initiate_payment(request: PaymentRequest):
         session_id = str(uuid.uuid4())
         active_sessions[session_id] = {
             "account_id": request.account_id,
+            "service_type": request.service_type,
+            "consumer_id": request.consumer_id,
             "status": "pending"
         }
         
@@ -37,6 +39,8 @@ async def initiate_payment(request: PaymentRequest):
             qr_code_base64=qr_base64,
             session_id=session_id
         )
+    except QRCaptureBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         return PaymentResponse(
             success=False,
@@ -59,5 +63,8 @@ async def confirm_payment(session_id: str):
     if session_id not in active_sessions:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    active_sessions[session_id]["status"] = "completed"
+    session = active_sessions[session_id]
+    session["status"] = "completed"
+    # The portal now shows the bill as paid; don't serve the cached unpaid result
+    await get_navigator().invalidate_bill_cache(session["service_type"], session["consumer_id"])
     return {"message": "Payment confirmed", "status": "completed"}
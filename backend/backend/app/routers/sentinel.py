@@ -56,8 +56,9 @@ async def analyze_violation(request: ViolationAnalysisRequest):
         
         engine = get_sentinel_engine()
         
-        # Extract EXIF data
-        exif_data = engine.extract_exif_data(image_bytes)
+        # Extract EXIF (GPS, timestamp) while a shrunk copy is analyzed; the
+        # original upload is what gets stored and emailed
+        exif_data, analysis = await engine.process_violation(image_bytes)
         
         # Use device location as fallback if EXIF doesn't have GPS
         if not exif_data.get("latitude") and request.device_latitude:
@@ -66,9 +67,6 @@ async def analyze_violation(request: ViolationAnalysisRequest):
             exif_data["location_string"] = f"{request.device_latitude:.6f}, {request.device_longitude:.6f}"
             exif_data["location_source"] = "device"
         
-        # Analyze with AI
-        analysis = await engine.analyze_violation(image_bytes)
-        
         # Save image
         image_id = str(uuid.uuid4())
         image_path = VIOLATIONS_DIR / f"{image_id}.jpg"
@@ -24,7 +24,7 @@ from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
 
 from app.config import settings
-from app.services.kerala_authorities import KeralaAuthorityDirectory
+from app.services.kerala_authorities import get_authority_directory
 
 logger = logging.getLogger(__name__)
 
@@ -97,7 +97,7 @@ class DisasterEngine:
             aws_secret_access_key=settings.aws_secret_access_key,
         )
         self.model_id = settings.bedrock_model_id
-        self.authority_directory = KeralaAuthorityDirectory()
+        self.authority_directory = get_authority_directory()
     
     def _detect_media_type(self, image_data: bytes) -> str:
         """Detect image media type from magic bytes."""
@@ -4,12 +4,161 @@ Kerala Authority Directory
 Provides contact information for emergency services and government departments
 across Kerala districts and municipalities.
 """
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import logging
+import math
+import sys
 
 logger = logging.getLogger(__name__)
 
 
+def _to_unit_vector(latitude: float, longitude: float) -> Tuple[float, float, float]:
+    """Project a lat/lon pair (degrees) onto the unit sphere."""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def _nearest_index(
+    vectors: Tuple[tuple, ...],
+    qx: float,
+    qy: float,
+    qz: float
+) -> int:
+    """Index of the center in vectors with the largest dot product against q."""
+    _, x, y, z = vectors[0]
+    nearest = 0
+    max_similarity = qx * x + qy * y + qz * z
+    
+    for index in range(1, len(vectors)):
+        _, x, y, z = vectors[index]
+        similarity = qx * x + qy * y + qz * z
+        if similarity > max_similarity:
+            max_similarity = similarity
+            nearest = index
+    
+    return nearest
+
+
+# Grid marker for cells that straddle a district boundary
+_GRID_AMBIGUOUS = 0xFF
+
+
+def _build_district_grid(
+    vectors: Tuple[tuple, ...],
+    lat_lo: float,
+    lon_lo: float,
+    rows: int,
+    cols: int,
+    step: float
+) -> bytes:
+    """
+    Precompute a row-major lat/lon grid of nearest-center indices.
+    
+    A cell stores a center index only when all four of its corners share the
+    same nearest center (district regions are convex, so the whole cell does
+    too); otherwise it stores _GRID_AMBIGUOUS and lookups fall back to a scan.
+    """
+    corners = [
+        [
+            _nearest_index(vectors, *_to_unit_vector(lat_lo + i * step, lon_lo + j * step))
+            for j in range(cols + 1)
+        ]
+        for i in range(rows + 1)
+    ]
+    
+    grid = bytearray(rows * cols)
+    for i in range(rows):
+        for j in range(cols):
+            index = corners[i][j]
+            if index == corners[i][j + 1] == corners[i + 1][j] == corners[i + 1][j + 1]:
+                grid[i * cols + j] = index
+            else:
+                grid[i * cols + j] = _GRID_AMBIGUOUS
+    return bytes(grid)
+
+
+def _group_by_type(authorities: Dict[str, dict]) -> Dict[str, Tuple[dict, ...]]:
+    """Group authority records by their "type" field, preserving order."""
+    groups: Dict[str, List[dict]] = {}
+    for auth in authorities.values():
+        groups.setdefault(auth.get("type"), []).append(auth)
+    return {auth_type: tuple(group) for auth_type, group in groups.items()}
+
+
+# Short, heavily repeated record fields whose values are interned
+_INTERNED_FIELDS = ("type", "department", "level", "key")
+
+
+def _intern_fields(record: dict) -> dict:
+    """Intern the repeated short fields of an authority record in place."""
+    for field in _INTERNED_FIELDS:
+        if field in record:
+            record[field] = sys.intern(record[field])
+    return record
+
+
+def _with_state_fields(authorities: Dict[str, dict]) -> Dict[str, dict]:
+    """Build full state-level records, tagged with their level and key."""
+    records = {}
+    for key, auth in authorities.items():
+        records[key] = _intern_fields({**auth, "level": "state", "key": key})
+    return records
+
+
+def _build_district_rows(
+    district_authorities: Dict[str, dict]
+) -> Dict[str, Tuple[dict, ...]]:
+    """Prebuild the collectorate and emergency-center rows for each district."""
+    rows = {}
+    for district, district_info in district_authorities.items():
+        # Only populated contact numbers are included in each row
+        collectorate = {
+            "name": f"{district} District Collectorate",
+            "department": "District Administration",
+            "type": "government",
+            "level": "district",
+            "key": "collectorate",
+            "district": district
+        }
+        if district_info.get("collectorate"):
+            collectorate["phone"] = district_info["collectorate"]
+        if district_info.get("control_room"):
+            collectorate["alt_phone"] = district_info["control_room"]
+        
+        # District emergency operations center
+        deoc = {
+            "name": f"{district} Emergency Operations Center",
+            "department": "District Emergency Management",
+            "type": "emergency",
+            "level": "district",
+            "key": "deoc",
+            "district": district
+        }
+        if district_info.get("district_emergency"):
+            deoc["phone"] = district_info["district_emergency"]
+        
+        rows[district] = (_intern_fields(collectorate), _intern_fields(deoc))
+    return rows
+
+
+def _resolve_keys(keys, records: Dict[str, dict]) -> Tuple[dict, ...]:
+    """Resolve authority keys to their records, skipping unknown keys."""
+    return tuple(records[key] for key in keys if key in records)
+
+
+def _resolve_mapping(
+    mapping: Dict[str, List[str]],
+    records: Dict[str, dict]
+) -> Dict[str, Tuple[dict, ...]]:
+    """Resolve every subcategory's authority keys to their records."""
+    return {
+        subcategory: _resolve_keys(keys, records)
+        for subcategory, keys in mapping.items()
+    }
+
+
 class KeralaAuthorityDirectory:
     """
     Directory of Kerala government authorities and emergency services.
@@ -105,6 +254,18 @@ class KeralaAuthorityDirectory:
         }
     }
     
+    # State authorities grouped by type, built once for directory listings
+    _STATE_AUTHORITIES_BY_TYPE = _group_by_type(STATE_AUTHORITIES)
+    
+    # Fallback authority keys for unmapped subcategories
+    DEFAULT_AUTHORITY_KEYS = ("LSGD", "Police")
+    
+    # Full state-level records and the subcategory mapping resolved to them,
+    # so get_authorities() needs a single lookup per request
+    _STATE_AUTH_FULL = _with_state_fields(STATE_AUTHORITIES)
+    _RESOLVED_MAPPING = _resolve_mapping(AUTHORITY_MAPPING, _STATE_AUTH_FULL)
+    _DEFAULT_RESOLVED = _resolve_keys(DEFAULT_AUTHORITY_KEYS, _STATE_AUTH_FULL)
+    
     # District-wise authorities (sample - can be expanded)
     DISTRICT_AUTHORITIES = {
         "Thiruvananthapuram": {
@@ -179,6 +340,9 @@ class KeralaAuthorityDirectory:
         }
     }
     
+    # Prebuilt district-level rows returned by get_authorities()
+    _DISTRICT_ROWS = _build_district_rows(DISTRICT_AUTHORITIES)
+    
     # Approximate district boundaries (lat/lon centers)
     DISTRICT_COORDINATES = {
         "Thiruvananthapuram": (8.5241, 76.9366),
@@ -197,8 +361,24 @@ class KeralaAuthorityDirectory:
         "Kasaragod": (12.4996, 74.9869)
     }
     
-    def __init__(self):
-        logger.info("KeralaAuthorityDirectory initialized")
+    # District centers on the unit sphere; the nearest center by great-circle
+    # distance is the one with the largest dot product against the query.
+    _DISTRICT_VECTORS = tuple(
+        (district, *_to_unit_vector(lat, lon))
+        for district, (lat, lon) in DISTRICT_COORDINATES.items()
+    )
+    
+    # Kerala bounding box (degrees)
+    _LAT_LO, _LAT_HI = 8.0, 13.0
+    _LON_LO, _LON_HI = 74.0, 78.0
+    
+    # Nearest-district lookup grid over the bounding box
+    _GRID_STEP = 0.05
+    _GRID_ROWS = round((_LAT_HI - _LAT_LO) / _GRID_STEP)
+    _GRID_COLS = round((_LON_HI - _LON_LO) / _GRID_STEP)
+    _DISTRICT_GRID = _build_district_grid(
+        _DISTRICT_VECTORS, _LAT_LO, _LON_LO, _GRID_ROWS, _GRID_COLS, _GRID_STEP
+    )
     
     def get_district_from_coordinates(
         self, 
@@ -207,27 +387,29 @@ class KeralaAuthorityDirectory:
     ) -> Optional[str]:
         """
         Determine the district based on GPS coordinates.
-        Uses simple nearest-center approach.
+        Uses the nearest district center by great-circle distance.
         """
         if latitude is None or longitude is None:
             return None
         
-        # Kerala bounding box check
-        if not (8.0 <= latitude <= 13.0 and 74.0 <= longitude <= 78.0):
+        # Kerala bounding box check (NaN fails every comparison, so it is rejected too)
+        if not (self._LAT_LO <= latitude <= self._LAT_HI
+                and self._LON_LO <= longitude <= self._LON_HI):
             logger.warning(f"Coordinates {latitude}, {longitude} outside Kerala")
             return None
         
-        # Find nearest district center
-        min_distance = float('inf')
-        nearest_district = None
+        # Most cells resolve directly from the precomputed grid
+        row = min(int((latitude - self._LAT_LO) / self._GRID_STEP), self._GRID_ROWS - 1)
+        col = min(int((longitude - self._LON_LO) / self._GRID_STEP), self._GRID_COLS - 1)
+        index = self._DISTRICT_GRID[row * self._GRID_COLS + col]
         
-        for district, (lat, lon) in self.DISTRICT_COORDINATES.items():
-            distance = ((latitude - lat) ** 2 + (longitude - lon) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                nearest_district = district
+        # Cells on a district boundary need the exact nearest-center scan
+        if index == _GRID_AMBIGUOUS:
+            index = _nearest_index(
+                self._DISTRICT_VECTORS, *_to_unit_vector(latitude, longitude)
+            )
         
-        return nearest_district
+        return self._DISTRICT_VECTORS[index][0]
     
     def get_authorities(
         self,
@@ -239,65 +421,27 @@ class KeralaAuthorityDirectory:
         """
         Get list of relevant authorities for an incident.
         """
-        authorities = []
-        
-        # Get authority types for this subcategory
-        authority_keys = self.AUTHORITY_MAPPING.get(
-            subcategory.lower(), 
-            ["LSGD", "Police"]  # Default fallback
-        )
-        
-        # Add state-level authorities
-        for key in authority_keys:
-            if key in self.STATE_AUTHORITIES:
-                auth = self.STATE_AUTHORITIES[key].copy()
-                auth["level"] = "state"
-                auth["key"] = key
-                authorities.append(auth)
+        # Add state-level authorities for this subcategory; the prebuilt
+        # records are shared, so callers get their own copies
+        authorities = [
+            dict(auth)
+            for auth in self._RESOLVED_MAPPING.get(subcategory.lower(), self._DEFAULT_RESOLVED)
+        ]
         
         # Add district-level contacts if location available
         district = self.get_district_from_coordinates(latitude, longitude)
-        if district and district in self.DISTRICT_AUTHORITIES:
-            district_info = self.DISTRICT_AUTHORITIES[district]
-            authorities.append({
-                "name": f"{district} District Collectorate",
-                "department": "District Administration",
-                "phone": district_info.get("collectorate", ""),
-                "alt_phone": district_info.get("control_room", ""),
-                "type": "government",
-                "level": "district",
-                "key": "collectorate",
-                "district": district
-            })
-            
-            # Add district emergency operations center
-            authorities.append({
-                "name": f"{district} Emergency Operations Center",
-                "department": "District Emergency Management",
-                "phone": district_info.get("district_emergency", ""),
-                "type": "emergency",
-                "level": "district", 
-                "key": "deoc",
-                "district": district
-            })
+        if district:
+            authorities.extend(dict(row) for row in self._DISTRICT_ROWS.get(district, ()))
         
         return authorities
     
     def get_all_emergency_contacts(self) -> dict:
         """Get all emergency contacts organized by type."""
+        by_type = self._STATE_AUTHORITIES_BY_TYPE
         return {
-            "emergency": [
-                auth for auth in self.STATE_AUTHORITIES.values() 
-                if auth.get("type") == "emergency"
-            ],
-            "utility": [
-                auth for auth in self.STATE_AUTHORITIES.values()
-                if auth.get("type") == "utility"
-            ],
-            "government": [
-                auth for auth in self.STATE_AUTHORITIES.values()
-                if auth.get("type") == "government"
-            ],
+            "emergency": list(by_type.get("emergency", ())),
+            "utility": list(by_type.get("utility", ())),
+            "government": list(by_type.get("government", ())),
             "districts": self.DISTRICT_AUTHORITIES
         }
     
@@ -315,3 +459,16 @@ class KeralaAuthorityDirectory:
                 results.append(result)
         
         return results
+
+
+# Singleton instance
+_authority_directory_instance: Optional[KeralaAuthorityDirectory] = None
+
+
+def get_authority_directory() -> KeralaAuthorityDirectory:
+    """Get or create the shared KeralaAuthorityDirectory instance."""
+    global _authority_directory_instance
+    if _authority_directory_instance is None:
+        _authority_directory_instance = KeralaAuthorityDirectory()
+        logger.info("KeralaAuthorityDirectory initialized")
+    return _authority_directory_instance
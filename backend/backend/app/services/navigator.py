@@ -6,14 +6,27 @@ sandbox for navigating Kerala utility portals with real browser automation.
 """
 import asyncio
 import base64
+import copy
+import functools
+import hashlib
 import json
 import logging
+import operator
+import os
+import re
+import string
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any, Union
-from datetime import datetime
+from datetime import datetime, timedelta
 from dataclasses import dataclass, field
+from pathlib import Path
 
 import boto3
+import orjson
 from botocore.config import Config
 from botocore.exceptions import ClientError
 import httpx
@@ -27,13 +40,889 @@ logger = logging.getLogger(__name__)
 
 # Try to import browser automation tools
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.sync_api import sync_playwright, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
     BROWSER_AVAILABLE = True
     logger.info("Playwright browser automation available")
 except ImportError as e:
     BROWSER_AVAILABLE = False
     logger.warning(f"Browser automation not available: {e}. Using Nova Pro vision fallback.")
 
+try:
+    import aioboto3
+    AIOBOTO3_AVAILABLE = True
+except ImportError:
+    AIOBOTO3_AVAILABLE = False
+
+
+# Currency symbols, whitespace and thousand separators stripped from scraped
+# amounts in a single str.translate pass
+_AMOUNT_STRIP = str.maketrans('', '', '₹$Rs,' + string.whitespace + '\u00a0')
+
+# Everything but digits and the decimal point, stripped from scraped units.
+# The translate table covers ASCII (unit names, separators, whitespace); the
+# regex only runs when something non-ASCII is left over.
+_UNITS_STRIP = str.maketrans('', '', ''.join(c for c in string.printable if c not in string.digits + '.') + '\u00a0')
+_UNITS_STRIP_RE = re.compile(r'[^\d.]')
+
+# History rows: the first (optionally signed) number in an amount cell, so a
+# "Rs." prefix cannot leave a stray decimal point behind, and the status
+# keyword as a whole word, so "Unpaid" is not read as "paid"
+_HISTORY_AMOUNT_RE = re.compile(r'(-?)[^\d-]*(\d[\d,]*(?:\.\d+)?)')
+_HISTORY_STATUS_RE = re.compile(r'\b(paid|settled|pending)\b', re.IGNORECASE)
+_HISTORY_STATUS_MAP = {
+    'paid': PaymentStatus.PAID,
+    'settled': PaymentStatus.PAID,
+    'pending': PaymentStatus.PENDING,
+}
+
+# Elements the portal flow waits on instead of fixed sleeps
+_SEARCH_INPUT_SELECTOR = (
+    '#searchValue, input[name="searchValue"], #consumerNumber, input[name="consumer_id"], '
+    '#buildingId, input[name="buildingId"], input[type="text"]'
+)
+_RESULTS_SELECTOR = '#bill-view:not(.hidden), #bill-details, #challan-details'
+_RESULTS_TIMEOUT_MS = 6000
+
+# Portal form probe. One page.evaluate() walks the DOM once and tags the
+# search input, CAPTCHA input and submit button with data attributes; the
+# actual typing, checking and clicking then go through Playwright locators so
+# the page sees real input events.
+_FORM_PROBE_SCRIPT = """(searchType) => {
+    const CAPTCHA_MARKER = '#captcha-text, #captcha-image, .captcha-image, [id*=captcha]';
+    const CAPTCHA_INPUT = '#captchaValue, input[name=captchaValue], input[placeholder*=captcha i]';
+    const FILL_SELECTORS = [
+        'input[id="searchValue"]', 'input[name="searchValue"]',
+        'input[id="consumerNumber"]', 'input[name="consumer_id"]',
+        'input[id="buildingId"]', 'input[name="buildingId"]',
+        'input[type="text"]'
+    ];
+    const SUBMIT_SELECTORS = [
+        'button[type="submit"]', 'input[type="submit"]',
+        '.btn-primary', '.submit-btn', '#submit', 'button'
+    ];
+    const result = { has_captcha: false, captcha_value: '', typed_selector: null, search_type: null, submit_selector: null };
+
+    // One DOM walk buckets the CAPTCHA, searchType radio, best fill input and submit button
+    let captchaMarker = null, captchaInput = null, fillInput = null, submitButton = null;
+    let fillRank = FILL_SELECTORS.length, submitRank = SUBMIT_SELECTORS.length;
+    for (const el of document.querySelectorAll('input, button, .btn-primary, .submit-btn, #submit, [id*=captcha], .captcha-image')) {
+        if (!captchaMarker && el.matches(CAPTCHA_MARKER)) captchaMarker = el;
+        const submit = SUBMIT_SELECTORS.findIndex(sel => el.matches(sel));
+        if (submit !== -1 && submit < submitRank) {
+            submitButton = el;
+            submitRank = submit;
+        }
+        if (el.tagName !== 'INPUT') continue;
+        if (el.matches(CAPTCHA_INPUT)) {
+            captchaInput = captchaInput || el;
+            continue;
+        }
+        if (el.name === 'searchType') {
+            if (el.value === searchType) result.search_type = searchType;
+            continue;
+        }
+        const rank = FILL_SELECTORS.findIndex(sel => el.matches(sel));
+        if (rank !== -1 && rank < fillRank) {
+            fillInput = el;
+            fillRank = rank;
+        }
+    }
+    result.has_captcha = !!(captchaMarker && captchaInput);
+
+    if (fillInput) {
+        fillInput.setAttribute('data-oneway-fill', '');
+        result.typed_selector = FILL_SELECTORS[fillRank];
+    }
+    if (submitButton) {
+        submitButton.setAttribute('data-oneway-submit', '');
+        result.submit_selector = SUBMIT_SELECTORS[submitRank];
+    }
+
+    if (result.has_captcha) {
+        captchaInput.setAttribute('data-oneway-captcha', '');
+        const txt = document.getElementById('captcha-text');
+        const svgText = document.querySelector('#captcha-image svg text, .captcha-image svg text');
+        if (txt) result.captcha_value = txt.textContent.trim();
+        else if (svgText) result.captcha_value = svgText.textContent.trim();
+    }
+
+    return result;
+}"""
+
+# Result-page scrapers shared by all portals
+_DOM_EXTRACT_SCRIPT = """() => {
+    const data = {};
+
+    // One combined query per field; the per-field priority order is kept by
+    // ranking the matches rather than querying each selector in turn
+    const firstText = (selectors) => {
+        let best = null, bestRank = selectors.length;
+        for (const el of document.querySelectorAll(selectors.join(', '))) {
+            const text = el.textContent.trim();
+            if (!text) continue;
+            const rank = selectors.findIndex(sel => el.matches(sel));
+            if (rank < bestRank) {
+                best = text;
+                bestRank = rank;
+            }
+        }
+        return best;
+    };
+
+    const consumerName = firstText(['#consumer-name', '#display-owner', '#owner-name', '#bill-name']);
+    if (consumerName) data.consumer_name = consumerName;
+
+    const amountDue = firstText(['#display-fine', '#display-amount', '#bill-amount', '#tax-amount']);
+    if (amountDue) data.amount_due = amountDue;
+
+    const status = firstText(['#display-status', '#bill-status', '#payment-status']);
+    if (status) data.status = status.toLowerCase();
+
+    // Extract from details div if not found yet
+    if (!data.amount_due || !data.consumer_name) {
+        const detailsDiv = document.querySelector('#bill-details, #challan-details, #property-details');
+        if (detailsDiv) {
+            // One traversal collects every label/value cell, paired by row div
+            const rows = new Map();
+            for (const el of detailsDiv.querySelectorAll('div > span, div > strong')) {
+                const row = rows.get(el.parentElement) || {};
+                if (el.tagName === 'SPAN') row.label = row.label || el;
+                else row.value = row.value || el;
+                rows.set(el.parentElement, row);
+            }
+
+            for (const { label, value } of rows.values()) {
+                if (!label || !value) continue;
+                const labelText = label.textContent.trim().toLowerCase();
+                const valueText = value.textContent.trim();
+
+                if ((labelText.includes('amount') || labelText.includes('fine') || labelText.includes('tax')) && !data.amount_due) {
+                    data.amount_due = valueText;
+                }
+                else if ((labelText.includes('unit') || labelText.includes('consumption')) && !data.units_consumed) {
+                    data.units_consumed = valueText;
+                }
+                else if (labelText.includes('due date') && !data.due_date) {
+                    data.due_date = valueText;
+                }
+            }
+        }
+    }
+
+    return data;
+}"""
+
+_HISTORY_SCRIPT = """() => {
+    const historyData = [];
+    const billList = document.querySelector('#bill-list');
+    if (!billList) return historyData;
+
+    for (const item of billList.querySelectorAll('.bill-item, button')) {
+        // Row layout is <left div: due span> ... <right div: amount strong, status span>
+        const leftDiv = item.firstElementChild;
+        const rightDiv = item.lastElementChild;
+        if (!leftDiv || !rightDiv || leftDiv.tagName !== 'DIV' || rightDiv.tagName !== 'DIV') continue;
+
+        const amountStrong = rightDiv.querySelector('strong');
+        const amountText = amountStrong ? amountStrong.textContent.trim() : '';
+        if (!amountText) continue;
+
+        const historyItem = { amount: amountText };
+
+        const dueSpan = leftDiv.querySelector('span');
+        const dueText = dueSpan ? dueSpan.textContent.trim() : '';
+        if (dueText) {
+            const dateMatch = dueText.match(/\\d{4}-\\d{2}-\\d{2}/);
+            historyItem.date = dateMatch ? dateMatch[0] : dueText.replace('Due ', '');
+        }
+
+        const statusSpan = rightDiv.querySelector('span');
+        const statusText = statusSpan ? statusSpan.textContent.trim() : '';
+        if (statusText) historyItem.status = statusText;
+
+        historyData.push(historyItem);
+    }
+
+    return historyData;
+}"""
+
+# Only the bill subtree is sent to Bedrock; full portal pages are mostly
+# unrelated markup that inflates input tokens
+_BILL_HTML_MAX_CHARS = 16384
+_BILL_HTML_SCRIPT = """(maxChars) => {
+    const root = document.querySelector('#bill-view, #bill-details, #challan-details, main') || document.body;
+    return root.outerHTML.slice(0, maxChars);
+}"""
+
+# Waits for the results view with a MutationObserver instead of Python-side
+# polling, lets the portal populate its fields, then scrapes everything. The
+# bill markup rides along only when the DOM fields are incomplete.
+_RESULTS_SCRIPT = f"""async ({{ timeoutMs, htmlMaxChars }}) => {{
+    const ready = () => Array.from(document.querySelectorAll('{_RESULTS_SELECTOR}'))
+        .some(el => el.getClientRects().length > 0);
+
+    let visible = ready();
+    if (!visible && timeoutMs > 0) {{
+        visible = await new Promise(resolve => {{
+            const observer = new MutationObserver(() => {{
+                if (ready()) {{
+                    observer.disconnect();
+                    clearTimeout(timer);
+                    resolve(true);
+                }}
+            }});
+            observer.observe(document.body, {{
+                subtree: true, childList: true,
+                attributes: true, attributeFilter: ['class', 'style', 'hidden']
+            }});
+            const timer = setTimeout(() => {{
+                observer.disconnect();
+                resolve(false);
+            }}, timeoutMs);
+        }});
+    }}
+    if (visible) await new Promise(resolve => setTimeout(resolve, 50));
+
+    const dom_data = ({_DOM_EXTRACT_SCRIPT})();
+    const history_data = ({_HISTORY_SCRIPT})();
+    const needHtml = htmlMaxChars > 0 && !(dom_data.consumer_name && dom_data.amount_due);
+
+    return {{
+        visible,
+        dom_data,
+        history_data,
+        html: needHtml ? ({_BILL_HTML_SCRIPT})(htmlMaxChars) : null
+    }};
+}}"""
+
+
+class _StreamedJsonCollector:
+    """
+    Accumulates text deltas from an invoke_model_with_response_stream body
+    and reports when the first top-level JSON object has closed.
+    """
+    
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._started = False
+    
+    def feed(self, event: Dict[str, Any]) -> bool:
+        """Consume one stream event; returns True once the JSON object is complete."""
+        chunk = event.get('chunk')
+        if not chunk:
+            return False
+        payload = orjson.loads(chunk['bytes'])
+        text = payload.get('contentBlockDelta', {}).get('delta', {}).get('text')
+        if not text:
+            return False
+        self._parts.append(text)
+        for ch in text:
+            if ch == '{':
+                self._depth += 1
+                self._started = True
+            elif ch == '}' and self._started:
+                self._depth -= 1
+        return self._started and self._depth <= 0
+    
+    @property
+    def text(self) -> str:
+        return ''.join(self._parts)
+
+
+def _collect_streamed_json_text(event_stream) -> str:
+    """Read a response stream just far enough to get the first JSON object."""
+    collector = _StreamedJsonCollector()
+    try:
+        for event in event_stream:
+            if collector.feed(event):
+                break
+    finally:
+        event_stream.close()
+    return collector.text
+
+
+async def _collect_streamed_json_text_async(event_stream) -> str:
+    """aiobotocore counterpart of _collect_streamed_json_text."""
+    collector = _StreamedJsonCollector()
+    try:
+        async for event in event_stream:
+            if collector.feed(event):
+                break
+    finally:
+        event_stream.close()
+    return collector.text
+
+
+# Payment-page sentinels the QR capture flow waits on instead of fixed sleeps
+_QR_CONSUMER_INPUT_SELECTOR = (
+    '#consumerNumber, input[name="consumerNumber"], #consumer_id, input[name="consumer_id"], '
+    '#buildingId, input[name="buildingId"], #searchValue, input[name="searchValue"], input[type="text"]'
+)
+_UPI_BUTTON_SELECTOR = 'text=/pay by upi/i'
+
+# Third-party analytics, ads and web fonts the payment pages load; they only
+# delay networkidle and are never part of the QR
+_TRACKER_URL_RE = re.compile(
+    r'googletagmanager|google-analytics|doubleclick|hotjar|connect\.facebook|segment\.(?:io|com)|\.woff2?(?:[?#]|$)',
+    re.IGNORECASE
+)
+
+# Control labels matched (case-insensitively) by _CLICK_MATCH_SCRIPT. Submit
+# mirrors the original locator order: buttons by name, then the stricter text
+# match ('pay now', not bare 'pay'), then submit inputs, then a loose DOM scan
+_PAY_BY_UPI_PATTERN = 'pay by upi'
+_SUBMIT_PATTERN = 'proceed|continue|pay|view bill|submit|search'
+_SUBMIT_TEXT_PATTERN = 'proceed|continue|pay now|view bill|submit|search'
+_SUBMIT_INPUT_SELECTOR = "input[type='submit'], button[type='submit']"
+_CLICK_TARGET_SELECTOR = '[data-oneway-click]'
+
+# Payment-page scripts used by the QR capture flow
+_QR_CONSUMER_FILL_SCRIPT = """(value) => {
+    const selectors = [
+        'input[id="consumerNumber"]', 'input[name="consumerNumber"]',
+        'input[id="consumer_id"]', 'input[name="consumer_id"]',
+        'input[id="buildingId"]', 'input[name="buildingId"]',
+        'input[id="searchValue"]', 'input[name="searchValue"]',
+        'input[type="text"]'
+    ];
+    for (const sel of selectors) {
+        const input = document.querySelector(sel);
+        if (input) {
+            input.value = value;
+            input.dispatchEvent(new Event('input', { bubbles: true }));
+            input.dispatchEvent(new Event('change', { bubbles: true }));
+            return sel;
+        }
+    }
+    return null;
+}"""
+
+# Finds the first visible control to click in a single round-trip: buttons by
+# accessible name (role), then the innermost element carrying the text (text,
+# defaulting to role), then any fallback selector, then the innermost element
+# matching the loose pattern. Tags the match with data-oneway-click so Playwright
+# can click it with its actionability checks. Returns how it matched, or null.
+_CLICK_MATCH_SCRIPT = """({ role, text, fallback, loose }) => {
+    const label = el => (el.innerText || el.textContent || el.value || '').trim();
+    const shown = el => el.getClientRects().length > 0;
+    const find = (selector, test) => Array.from(document.querySelectorAll(selector))
+        .find(el => shown(el) && test(el));
+    const innermost = (selector, re) => find(selector, el => re.test(label(el))
+        && !Array.from(el.children).some(child => re.test(label(child))));
+
+    document.querySelectorAll('[data-oneway-click]').forEach(el => el.removeAttribute('data-oneway-click'));
+
+    const roleRe = new RegExp(role, 'i');
+    let via = 'role';
+    let el = find(
+        'button, [role="button"], input[type="submit"], input[type="button"]',
+        el => roleRe.test(el.getAttribute('aria-label') || label(el))
+    );
+    if (!el) {
+        via = 'text';
+        el = innermost('a, button, div, span', new RegExp(text || role, 'i'));
+    }
+    if (!el && fallback) {
+        via = 'submit';
+        el = find(fallback, () => true);
+    }
+    if (!el && loose) {
+        via = 'dom';
+        el = innermost('button, a, div, span, input[type=submit]', new RegExp(loose, 'i'));
+    }
+    if (!el) return null;
+
+    el.setAttribute('data-oneway-click', '');
+    return via;
+}"""
+
+# Resolves to the first square-ish QR/UPI image or canvas rendered near the
+# centre of the viewport
+_QR_READY_SCRIPT = """() => {
+    const centerYMin = 0.2, centerYMax = 0.8, centerXMin = 0.2, centerXMax = 0.8;
+    const viewH = window.innerHeight || 1000;
+    const viewW = window.innerWidth || 1000;
+
+    // Look for square-ish imgs/canvas near the center
+    const candidates = [
+        ...document.querySelectorAll('img'),
+        ...document.querySelectorAll('canvas')
+    ];
+
+    for (const el of candidates) {
+        const rect = el.getBoundingClientRect();
+        const w = rect.width, h = rect.height;
+        if (w < 80 || h < 80) continue;
+        const aspect = Math.min(w, h) / Math.max(w, h);
+        if (aspect < 0.7) continue; // keep near-square
+
+        const cy = (rect.top + rect.bottom) / 2 / viewH;
+        const cx = (rect.left + rect.right) / 2 / viewW;
+        if (cy < centerYMin || cy > centerYMax || cx < centerXMin || cx > centerXMax) continue;
+
+        const src = (el.src || '').toLowerCase();
+        const alt = (el.alt || '').toLowerCase();
+        const title = (el.title || '').toLowerCase();
+        if (src.includes('qr') || src.includes('upi') || alt.includes('qr') || title.includes('qr')) {
+            return el;
+        }
+    }
+
+    return null;
+}"""
+# Resolves to the QR element as soon as it renders, or null after timeoutMs.
+# DOM mutations and resource loads (an <img> gaining its size) trigger
+# re-checks, so nothing polls on a timer.
+_QR_WAIT_SCRIPT = f"""(timeoutMs) => new Promise(resolve => {{
+    const find = {_QR_READY_SCRIPT};
+    const initial = find();
+    if (initial) return resolve(initial);
+
+    let observer, timer;
+    const check = () => {{
+        const el = find();
+        if (el) done(el);
+    }};
+    const done = value => {{
+        observer.disconnect();
+        document.removeEventListener('load', check, true);
+        clearTimeout(timer);
+        resolve(value);
+    }};
+    observer = new MutationObserver(check);
+    observer.observe(document.documentElement, {{ subtree: true, childList: true, attributes: true }});
+    document.addEventListener('load', check, true);
+    timer = setTimeout(() => done(null), timeoutMs);
+}})"""
+
+
+# Decodes the first {...} block in a model response and stops at its closing
+# brace, ignoring any trailing prose
+_JSON_DECODER = json.JSONDecoder()
+
+# Style blocks, tags and whitespace runs collapsed out of page content before it
+# is trimmed to the prompt budget. Script text is kept: embedded JSON state is
+# often the only place a raw-fetched portal carries the bill fields.
+_MARKUP_RE = re.compile(r'(?:<style\b.*?</style\s*>|<[^>]+>|\s)+', re.IGNORECASE | re.DOTALL)
+_PROMPT_PAGE_CHARS = 4000
+
+# Portal error banners; matched case-insensitively so the page markup is
+# never lowercased into a copy
+_PAGE_ERROR_RE = re.compile(r'not found|invalid|error|incorrect captcha|wrong captcha', re.IGNORECASE)
+
+# Portal math CAPTCHAs are always "<int> <op> <int>"
+_CAPTCHA_MATH_RE = re.compile(r'\s*(-?\d+)\s*([+\-*/x×÷])\s*(-?\d+)\s*=?\s*\??\s*')
+_CAPTCHA_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    'x': operator.mul,
+    '×': operator.mul,
+    # Truncate toward zero like the portals' int(a / b), not floor division
+    '/': lambda a, b: int(a / b),
+    '÷': lambda a, b: int(a / b),
+}
+
+
+@functools.lru_cache(maxsize=256)
+def _solve_math_captcha(expression: str) -> str:
+    """Evaluate a portal math CAPTCHA such as '7 x 3'. Raises on malformed input."""
+    match = _CAPTCHA_MATH_RE.fullmatch(expression)
+    if not match:
+        raise ValueError(f"Unsupported CAPTCHA expression: {expression!r}")
+    return str(_CAPTCHA_OPS[match[2]](int(match[1]), int(match[3])))
+
+
+def _wait_until_ready(page, selector: str, timeout_ms: int = 10000, idle_ms: int = 500) -> bool:
+    """
+    Wait briefly for the network to settle, then for selector to be visible.
+
+    idle_ms=0 skips the networkidle phase for callers whose sentinel already
+    proves the data has arrived. Returns False instead of raising when the
+    sentinel never shows up, so callers can carry on with whatever the page
+    currently renders.
+    """
+    if idle_ms:
+        try:
+            page.wait_for_load_state('networkidle', timeout=idle_ms * 4)
+        except PlaywrightTimeoutError:
+            pass
+    try:
+        page.wait_for_selector(selector, state='visible', timeout=timeout_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def _wait_for_qr(page, timeout_ms: int):
+    """
+    Run _QR_WAIT_SCRIPT on page and return the QR element handle, or None.
+    
+    A navigation that commits while the observer is pending destroys its
+    execution context; in that case wait for the new document and observe
+    again within the remaining time.
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    while True:
+        remaining_ms = max(0, int((deadline - time.monotonic()) * 1000))
+        try:
+            return page.evaluate_handle(_QR_WAIT_SCRIPT, remaining_ms).as_element()
+        except PlaywrightError as e:
+            if 'context was destroyed' not in str(e) or remaining_ms == 0:
+                raise
+            logger.info("Page navigated while waiting for the QR; re-observing the new document")
+            try:
+                page.wait_for_load_state('domcontentloaded', timeout=max(1, remaining_ms))
+            except PlaywrightTimeoutError:
+                return None
+
+
+def _block_trackers(route) -> None:
+    """Playwright route handler that aborts tracker and font requests."""
+    if _TRACKER_URL_RE.search(route.request.url):
+        route.abort()
+    else:
+        route.continue_()
+
+
+class _BrowserPool:
+    """
+    Long-lived headless Chromium instances for portal automation.
+    
+    Playwright's sync API is bound to the thread that started it, so every
+    worker thread keeps its own driver and browser for the life of the
+    process. Each job gets a fresh BrowserContext (cheap, isolated cookies
+    and storage) instead of a cold Chromium launch. The executor size bounds
+    concurrency; callers beyond it queue for a free worker.
+    """
+    
+    def __init__(self, size: int, thread_name_prefix: str = "playwright"):
+        self.size = size
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=thread_name_prefix)
+        self._local = threading.local()
+    
+    def _get_browser(self):
+        browser = getattr(self._local, "browser", None)
+        if browser is not None and browser.is_connected():
+            return browser
+        
+        playwright = getattr(self._local, "playwright", None)
+        if playwright is None:
+            playwright = sync_playwright().start()
+            self._local.playwright = playwright
+        
+        browser = playwright.chromium.launch(headless=True)
+        self._local.browser = browser
+        logger.info(f"Launched pooled Chromium in {threading.current_thread().name}")
+        return browser
+    
+    def _run_in_context(self, fn, loop, future):
+        # The result is handed back to the loop before the context is torn
+        # down, so closing it stays off the caller's critical path while
+        # still happening on this (owning) thread.
+        context = None
+        try:
+            context = self._get_browser().new_context()
+            result = fn(context.new_page())
+        except BaseException as e:
+            loop.call_soon_threadsafe(_resolve_future, future, None, e)
+        else:
+            loop.call_soon_threadsafe(_resolve_future, future, result, None)
+        finally:
+            if context is not None:
+                try:
+                    context.close()
+                except Exception as e:
+                    logger.warning(f"Failed to close pooled browser context: {e}")
+    
+    async def warm(self) -> None:
+        """Launch a browser on every worker thread ahead of the first job."""
+        loop = asyncio.get_running_loop()
+        # Launches block for a while, so each submission spins up its own worker
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, self._get_browser) for _ in range(self.size)),
+            return_exceptions=True
+        )
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if failures:
+            logger.warning(f"Browser pool warm-up failed on {len(failures)}/{self.size} workers: {failures[0]}")
+    
+    async def run(self, fn):
+        """Run fn(page) on a pooled browser and return its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._executor.submit(self._run_in_context, fn, loop, future)
+        return await future
+
+
+def _resolve_future(future: asyncio.Future, result: Any, error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+_browser_pool_instance: Optional[_BrowserPool] = None
+_qr_browser_pool_instance: Optional[_BrowserPool] = None
+
+
+async def warm_browser_pool() -> None:
+    """Start the pooled browsers at app startup when prewarming is enabled."""
+    if BROWSER_AVAILABLE and settings.playwright_prewarm:
+        await asyncio.gather(get_browser_pool().warm(), get_qr_browser_pool().warm())
+
+
+def get_browser_pool() -> _BrowserPool:
+    """Get or create the process-wide browser pool."""
+    global _browser_pool_instance
+    if _browser_pool_instance is None:
+        _browser_pool_instance = _BrowserPool(settings.playwright_pool_size)
+    return _browser_pool_instance
+
+
+def get_qr_browser_pool() -> _BrowserPool:
+    """
+    Get or create the browser pool reserved for payment QR captures.
+    
+    A capture holds its browser for tens of seconds, so it gets its own
+    workers rather than starving bill lookups on the main pool.
+    """
+    global _qr_browser_pool_instance
+    if _qr_browser_pool_instance is None:
+        _qr_browser_pool_instance = _BrowserPool(settings.playwright_qr_pool_size, "playwright-qr")
+    return _qr_browser_pool_instance
+
+
+class QRCaptureBusyError(RuntimeError):
+    """Raised when every QR capture slot is taken; callers should retry later."""
+
+
+# A QR capture holds a browser for tens of seconds, so admit at most one per
+# QR pool worker and turn the rest away instead of queueing them indefinitely
+_qr_capture_slots = asyncio.Semaphore(settings.playwright_qr_pool_size)
+
+
+# Bedrock runtime clients are thread-safe; build one per process instead of
+# paying credential resolution and service-model loading per agent instance.
+_shared_runtime_client = None
+_shared_runtime_client_lock = threading.Lock()
+
+
+def _runtime_client_config() -> Config:
+    return Config(
+        region_name=settings.aws_region,
+        retries={'max_attempts': settings.bedrock_max_attempts, 'mode': 'standard'},
+        connect_timeout=settings.bedrock_connect_timeout,
+        read_timeout=settings.bedrock_read_timeout,
+        max_pool_connections=25,
+        tcp_keepalive=True
+    )
+
+
+def _runtime_session_kwargs() -> Dict[str, str]:
+    session_kwargs = {'region_name': settings.aws_region}
+    if settings.aws_access_key_id and settings.aws_secret_access_key:
+        session_kwargs['aws_access_key_id'] = settings.aws_access_key_id
+        session_kwargs['aws_secret_access_key'] = settings.aws_secret_access_key
+    return session_kwargs
+
+
+def _get_shared_runtime_client():
+    """Get or create the process-wide bedrock-runtime client."""
+    global _shared_runtime_client
+    if _shared_runtime_client is None:
+        with _shared_runtime_client_lock:
+            if _shared_runtime_client is None:
+                session = boto3.session.Session(**_runtime_session_kwargs())
+                _shared_runtime_client = session.client('bedrock-runtime', config=_runtime_client_config())
+    return _shared_runtime_client
+
+
+# Native async client for the Bedrock HTML analysis, so a multi-second model
+# call does not hold a default-executor thread. Created lazily on the running
+# loop and kept open until close_async_runtime_client() at shutdown.
+_async_runtime_client = None
+_async_runtime_client_context = None
+_async_runtime_client_lock = asyncio.Lock()
+
+
+async def _get_async_runtime_client():
+    """Get or create the process-wide aioboto3 bedrock-runtime client."""
+    global _async_runtime_client, _async_runtime_client_context
+    if _async_runtime_client is None:
+        async with _async_runtime_client_lock:
+            if _async_runtime_client is None:
+                session = aioboto3.Session(**_runtime_session_kwargs())
+                context = session.client('bedrock-runtime', config=_runtime_client_config())
+                _async_runtime_client = await context.__aenter__()
+                _async_runtime_client_context = context
+    return _async_runtime_client
+
+
+async def close_async_runtime_client() -> None:
+    """Close the shared aioboto3 bedrock-runtime client, if it was created."""
+    global _async_runtime_client, _async_runtime_client_context
+    if _async_runtime_client_context is not None:
+        context = _async_runtime_client_context
+        _async_runtime_client = None
+        _async_runtime_client_context = None
+        await context.__aexit__(None, None, None)
+
+
+# Shared keep-alive HTTP/2 client for direct portal fetches, so the vision
+# fallback does not pay TCP + TLS setup on every call
+_http_client_instance: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the process-wide portal HTTP client."""
+    global _http_client_instance
+    if _http_client_instance is None:
+        _http_client_instance = httpx.AsyncClient(
+            http2=True,
+            timeout=30,
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+        )
+    return _http_client_instance
+
+
+async def close_http_client() -> None:
+    """Close the shared portal HTTP client, if it was created."""
+    global _http_client_instance
+    if _http_client_instance is not None:
+        await _http_client_instance.aclose()
+        _http_client_instance = None
+
+
+# Blocking boto3 Bedrock calls get their own pool so model latency and
+# browser work never queue behind each other or other default-executor users
+_BEDROCK_EXECUTOR = ThreadPoolExecutor(max_workers=16, thread_name_prefix="nav-bedrock")
+
+
+class _BillResultCache:
+    """
+    Short-lived cache of portal extraction results with request coalescing.
+    
+    Portals return the same bill for a consumer for minutes at a time, so a
+    hit skips the browser entirely. Concurrent misses for the same key share
+    one in-flight navigation instead of each launching their own. Failures
+    are never cached, and invalidate() drops a consumer's entries once a
+    payment changes what the portal would show. With a cache_dir, results are also written to disk so
+    they survive restarts and are shared between worker processes.
+    """
+    
+    def __init__(self, ttl_seconds: int, max_entries: int, cache_dir: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+    
+    async def get_or_fetch(self, key: tuple, fetch) -> Dict[str, Any]:
+        if self.ttl_seconds <= 0:
+            return await fetch()
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                return copy.deepcopy(result)
+            del self._entries[key]
+        
+        inflight = self._inflight.get(key)
+        if inflight is None and self.cache_dir is not None:
+            stored = await asyncio.to_thread(self._load_from_disk, key)
+            if stored is not None:
+                ttl_left, result = stored
+                self._remember(key, time.monotonic() + ttl_left, result)
+                return copy.deepcopy(result)
+            inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(fetch())
+            self._inflight[key] = inflight
+            inflight.add_done_callback(functools.partial(self._store, key))
+        
+        # Shield so one cancelled caller does not abort the shared navigation
+        return copy.deepcopy(await asyncio.shield(inflight))
+    
+    async def invalidate(self, url: str, consumer_id: str) -> None:
+        """Drop cached and in-flight results for a consumer on a portal, e.g. after a payment."""
+        keys = {key for key in (*self._entries, *self._inflight) if key[:2] == (url, consumer_id)}
+        for key in keys:
+            self._entries.pop(key, None)
+            # Current waiters still get the running fetch, but _store won't cache it
+            self._inflight.pop(key, None)
+        if self.cache_dir is not None:
+            keys.add((url, consumer_id, None))
+            await asyncio.to_thread(self._delete_from_disk, keys)
+    
+    def _store(self, key: tuple, future: asyncio.Future) -> None:
+        current = self._inflight.get(key) is future
+        if current:
+            del self._inflight[key]
+        if future.cancelled() or future.exception() is not None or not current:
+            return
+        self._remember(key, time.monotonic() + self.ttl_seconds, future.result())
+        if self.cache_dir is not None:
+            asyncio.get_running_loop().run_in_executor(None, self._save_to_disk, key, future.result())
+    
+    def _remember(self, key: tuple, expires_at: float, result: Dict[str, Any]) -> None:
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _disk_path(self, key: tuple) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(repr(key).encode()).hexdigest()}.json"
+    
+    def _load_from_disk(self, key: tuple) -> Optional[tuple]:
+        """Return (seconds of TTL left, result) for a fresh on-disk entry, else None."""
+        try:
+            stored = orjson.loads(self._disk_path(key).read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            logger.debug(f"Ignoring unreadable bill cache entry: {e}")
+            return None
+        ttl_left = stored.get("expires_at", 0) - time.time()
+        return (ttl_left, stored.get("result")) if ttl_left > 0 else None
+    
+    def _delete_from_disk(self, keys) -> None:
+        for key in keys:
+            try:
+                self._disk_path(key).unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning(f"Failed to drop bill cache entry: {e}")
+    
+    def _save_to_disk(self, key: tuple, result: Dict[str, Any]) -> None:
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(orjson.dumps({"expires_at": time.time() + self.ttl_seconds, "result": result}))
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning(f"Failed to persist bill cache entry: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+
+_bill_result_cache = _BillResultCache(
+    settings.bill_cache_ttl_seconds, settings.bill_cache_max_entries, settings.bill_cache_dir
+)
+
+
+# Finished sessions stay queryable for this long; one reaper task sweeps them
+_SESSION_RETENTION_SECONDS = 300
+_SESSION_REAP_INTERVAL_SECONDS = 60
+# Sessions still "active" after this long are treated as abandoned and swept too
+_SESSION_MAX_AGE_SECONDS = 900
+# Hard cap on tracked sessions; the oldest are evicted first if the reaper falls behind
+_MAX_TRACKED_SESSIONS = 10_000
+
 
 @dataclass
 class NavigationSession:
@@ -65,8 +954,17 @@ class AgentCoreBrowserAgent:
     
     NOVA_PRO_MODEL = "amazon.nova-pro-v1:0"
     
+    # Model families that accept Bedrock latency-optimized inference
+    LATENCY_OPTIMIZED_MODELS = (
+        "amazon.nova-pro",
+        "anthropic.claude-3-5-haiku",
+        "meta.llama3-1-70b",
+        "meta.llama3-1-405b",
+    )
+    
     def __init__(self):
         self._runtime_client = None
+        self._invoke_nova_stream = None
         self._browser_tool = None
         self._agent = None
         self.captcha_solver = CaptchaSolver()
@@ -75,25 +973,7 @@ class AgentCoreBrowserAgent:
     def _initialize_clients(self) -> None:
         """Initialize Bedrock AgentCore clients."""
         try:
-            boto_config = Config(
-                region_name=settings.aws_region,
-                retries={'max_attempts': 3, 'mode': 'adaptive'},
-                connect_timeout=30,
-                read_timeout=300,
-                max_pool_connections=25
-            )
-            
-            client_kwargs = {'config': boto_config}
-            
-            if settings.aws_access_key_id and settings.aws_secret_access_key:
-                client_kwargs['aws_access_key_id'] = settings.aws_access_key_id
-                client_kwargs['aws_secret_access_key'] = settings.aws_secret_access_key
-                client_kwargs['region_name'] = settings.aws_region
-            
-            self._runtime_client = boto3.client(
-                'bedrock-runtime', 
-                **client_kwargs
-            )
+            self._runtime_client = _get_shared_runtime_client()
             
             # Initialize Strands Browser Tool lazily to avoid uvloop/nest_asyncio conflict
             if BROWSER_AVAILABLE:
@@ -113,6 +993,27 @@ class AgentCoreBrowserAgent:
             self._initialize_clients()
         return self._runtime_client
     
+    def _stream_nova_json_text(self, body: bytes) -> str:
+        """Blocking Nova Pro streaming call; returns the first JSON object's text."""
+        if self._invoke_nova_stream is None:
+            self._invoke_nova_stream = functools.partial(
+                self.runtime_client.invoke_model_with_response_stream,
+                modelId=self.NOVA_PRO_MODEL,
+                contentType="application/json",
+                accept="application/json",
+                **self._performance_kwargs()
+            )
+        response = self._invoke_nova_stream(body=body)
+        return _collect_streamed_json_text(response['body'])
+    
+    def _performance_kwargs(self) -> Dict[str, str]:
+        """Extra invoke_model kwargs requesting latency-optimized inference, if enabled."""
+        if settings.bedrock_latency_optimized and any(
+            family in self.NOVA_PRO_MODEL for family in self.LATENCY_OPTIMIZED_MODELS
+        ):
+            return {"performanceConfigLatency": "optimized"}
+        return {}
+    
     async def navigate_and_extract(
         self,
         url: str,
@@ -134,10 +1035,12 @@ class AgentCoreBrowserAgent:
         Returns:
             Extracted data dictionary
         """
-        if BROWSER_AVAILABLE:
-            return await self._navigate_with_browser(url, instructions, consumer_id, number_plate)
-        else:
+        async def _fetch() -> Dict[str, Any]:
+            if BROWSER_AVAILABLE:
+                return await self._navigate_with_browser(url, instructions, consumer_id, number_plate)
             return await self._navigate_with_nova_vision(url, instructions, consumer_id, max_iterations)
+        
+        return await _bill_result_cache.get_or_fetch((url, consumer_id, number_plate), _fetch)
     
     async def _navigate_with_browser(
         self,
@@ -151,840 +1054,118 @@ class AgentCoreBrowserAgent:
         """
         logger.info(f"Starting Playwright navigation to: {url}")
         
-        def _run_playwright_automation():
-            """Run Playwright automation in sync context to avoid uvloop conflict."""
-            from playwright.sync_api import sync_playwright
-            import time
-            
-            results = {}
-            
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                
-                try:
-                    # Navigate to URL
-                    logger.info(f"Navigating to {url}")
-                    page.goto(url, wait_until='networkidle', timeout=30000)
-                    time.sleep(0.5)
-                    
-                    # Check for CAPTCHA
-                    has_captcha = page.evaluate("""() => {
-                        const captchaText = document.querySelector('#captcha-text, #captcha-image, .captcha-image, [id*=captcha]');
-                        const captchaInput = document.querySelector('#captchaValue, input[name=captchaValue], input[placeholder*=captcha i]');
-                        return captchaText && captchaInput ? 'found' : 'none';
-                    }""")
-                    
-                    logger.info(f"CAPTCHA detection: {has_captcha}")
-                    
-                    # Handle e-Challan search type selection
-                    has_search_type = page.evaluate("""() => {
-                        const radios = document.querySelectorAll('input[name=searchType]');
-                        return radios.length > 0 ? 'found' : 'none';
-                    }""")
-                    
-                    if has_search_type == 'found':
-                        if number_plate:
-                            logger.info(f"Selecting vehicle search for {number_plate}")
-                            page.evaluate("""() => {
-                                const vehicleRadio = document.querySelector('input[name=searchType][value=vehicle]');
-                                if (vehicleRadio) {
-                                    vehicleRadio.checked = true;
-                                    vehicleRadio.dispatchEvent(new Event('change', { bubbles: true }));
-                                }
-                            }""")
-                            time.sleep(0.2)
-                        else:
-                            page.evaluate("""() => {
-                                const challanRadio = document.querySelector('input[name=searchType][value=challan]');
-                                if (challanRadio) {
-                                    challanRadio.checked = true;
-                                    challanRadio.dispatchEvent(new Event('change', { bubbles: true }));
-                                }
-                            }""")
-                            time.sleep(0.2)
-                    
-                    # Fill search value (consumer ID or number plate)
-                    search_value = number_plate if number_plate else consumer_id
-                    logger.info(f"Entering search value: {search_value}")
-                    
-                    typed = page.evaluate(f"""() => {{
-                        const selectors = [
-                            'input[id="searchValue"]', 'input[name="searchValue"]',
-                            'input[id="consumerNumber"]', 'input[name="consumer_id"]',
-                            'input[id="buildingId"]', 'input[name="buildingId"]',
-                            'input[type="text"]'
-                        ];
-                        for (let sel of selectors) {{
-                            const input = document.querySelector(sel);
-                            if (input) {{
-                                input.value = '{search_value}';
-                                input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                                input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                                return sel;
-                            }}
-                        }}
-                        return null;
-                    }}""")
-                    
-                    if typed:
-                        logger.info(f"Typed value using selector: {typed}")
-                    
-                    # Handle CAPTCHA if present
-                    if has_captcha == 'found':
-                        logger.info("Solving CAPTCHA...")
-                        captcha_value = page.evaluate("""() => {
-                            const txt = document.querySelector('#captcha-text');
-                            if (txt) return txt.textContent.trim();
-                            const img = document.querySelector('#captcha-image, .captcha-image');
-                            if (img && img.querySelector('svg text')) {
-                                return img.querySelector('svg text').textContent.trim();
-                            }
-                            return '';
-                        }""")
-                        
-                        logger.info(f"CAPTCHA value: {captcha_value}")
-                        
-                        # Handle math CAPTCHA
-                        if captcha_value and any(op in captcha_value for op in ['+', '-', '*', '/', 'x', '×']):
-                            try:
-                                math_expr = captcha_value.replace('x', '*').replace('×', '*').replace('÷', '/')
-                                result = eval(math_expr, {"__builtins__": {}}, {})
-                                captcha_value = str(int(result))
-                                logger.info(f"Solved math CAPTCHA: {math_expr} = {captcha_value}")
-                            except Exception as e:
-                                logger.warning(f"Failed to solve math CAPTCHA: {e}")
-                        
-                        if captcha_value:
-                            page.evaluate(f"""() => {{
-                                const input = document.querySelector('#captchaValue') || 
-                                             document.querySelector('input[name="captchaValue"]');
-                                if (input) {{
-                                    input.value = '{captcha_value}';
-                                    input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                                }}
-                            }}""")
-                    
-                    # Click submit button
-                    logger.info("Clicking submit...")
-                    submit_selector = page.evaluate("""() => {
-                        const selectors = [
-                            'button[type="submit"]', 'input[type="submit"]',
-                            '.btn-primary', '.submit-btn', '#submit', 'button'
-                        ];
-                        for (let sel of selectors) {
-                            const btn = document.querySelector(sel);
-                            if (btn) {
-                                btn.click();
-                                return sel;
-                            }
-                        }
-                        return null;
-                    }""")
-                    
-                    if submit_selector:
-                        logger.info(f"Clicked submit using: {submit_selector}")
-                    
-                    # Wait for results
-                    logger.info("Waiting for results...")
-                    time.sleep(2)
-                    
-                    # Wait for bill-view to be visible
-                    for i in range(3):
-                        is_visible = page.evaluate("""() => {
-                            const billView = document.getElementById('bill-view');
-                            return billView && !billView.classList.contains('hidden') ? 'VISIBLE' : 'HIDDEN';
-                        }""")
-                        if is_visible == 'VISIBLE':
-                            logger.info("Results visible")
-                            time.sleep(0.5)
-                            break
-                        time.sleep(1)
-                    
-                    # Extract data from DOM
-                    logger.info("Extracting data from page...")
-                    extracted_data = page.evaluate("""() => {
-                        const data = {};
-                        
-                        // Consumer name
-                        const nameSelectors = ['#consumer-name', '#display-owner', '#owner-name', '#bill-name'];
-                        for (let sel of nameSelectors) {
-                            const el = document.querySelector(sel);
-                            if (el && el.textContent.trim()) {
-                                data.consumer_name = el.textContent.trim();
-                                break;
-                            }
-                        }
-                        
-                        // Amount due
-                        const amountSelectors = ['#display-fine', '#display-amount', '#bill-amount', '#tax-amount'];
-                        for (let sel of amountSelectors) {
-                            const el = document.querySelector(sel);
-                            if (el && el.textContent.trim()) {
-                                data.amount_due = el.textContent.trim();
-                                break;
-                            }
-                        }
-                        
-                        // Status
-                        const statusSelectors = ['#display-status', '#bill-status', '#payment-status'];
-                        for (let sel of statusSelectors) {
-                            const el = document.querySelector(sel);
-                            if (el && el.textContent.trim()) {
-                                data.status = el.textContent.trim().toLowerCase();
-                                break;
-                            }
-                        }
-                        
-                        // Extract from details div if not found yet
-                        if (!data.amount_due || !data.consumer_name) {
-                            const detailsDiv = document.querySelector('#bill-details, #challan-details, #property-details');
-                            if (detailsDiv) {
-                                detailsDiv.querySelectorAll('div').forEach(div => {
-                                    const label = div.querySelector('span');
-                                    const value = div.querySelector('strong');
-                                    if (label && value) {
-                                        const labelText = label.textContent.trim().toLowerCase();
-                                        const valueText = value.textContent.trim();
-                                        
-                                        if ((labelText.includes('amount') || labelText.includes('fine') || labelText.includes('tax')) && !data.amount_due) {
-                                            data.amount_due = valueText;
-                                        }
-                                        else if ((labelText.includes('unit') || labelText.includes('consumption')) && !data.units_consumed) {
-                                            data.units_consumed = valueText;
-                                        }
-                                        else if (labelText.includes('due date') && !data.due_date) {
-                                            data.due_date = valueText;
-                                        }
-                                    }
-                                });
-                            }
-                        }
-                        
-                        return data;
-                    }""")
-                    
-                    logger.info(f"Extracted DOM data: {extracted_data}")
-                    results['dom_data'] = extracted_data
-                    
-                    # Extract historical data
-                    history_data = page.evaluate("""() => {
-                        const historyData = [];
-                        const billList = document.querySelector('#bill-list');
-                        
-                        if (billList) {
-                            const billItems = billList.querySelectorAll('.bill-item, button');
-                            billItems.forEach(item => {
-                                const leftDiv = item.querySelector('div:first-child');
-                                const rightDiv = item.querySelector('div:last-child');
-                                
-                                if (leftDiv && rightDiv) {
-                                    const dueSpan = leftDiv.querySelector('span');
-                                    const amountStrong = rightDiv.querySelector('strong');
-                                    const statusSpan = rightDiv.querySelector('span.pill, span');
-                                    
-                                    const historyItem = {};
-                                    
-                                    if (dueSpan && dueSpan.textContent) {
-                                        const dueText = dueSpan.textContent.trim();
-                                        const dateMatch = dueText.match(/\\d{4}-\\d{2}-\\d{2}/);
-                                        historyItem.date = dateMatch ? dateMatch[0] : dueText.replace('Due ', '');
-                                    }
-                                    
-                                    if (amountStrong && amountStrong.textContent) {
-                                        historyItem.amount = amountStrong.textContent.trim();
-                                    }
-                                    
-                                    if (statusSpan && statusSpan.textContent) {
-                                        historyItem.status = statusSpan.textContent.trim();
-                                    }
-                                    
-                                    if (historyItem.amount) {
-                                        historyData.push(historyItem);
-                                    }
-                                }
-                            });
-                        }
-                        
-                        return historyData;
-                    }""")
-                    
-                    logger.info(f"Extracted {len(history_data)} historical bills")
-                    results['history_data'] = history_data
-                    
-                    # Get page HTML
-                    results['html'] = page.content()
-                    
-                finally:
-                    browser.close()
-            
-            return results
+        loop = asyncio.get_running_loop()
+        hedge: Dict[str, asyncio.Task] = {}
         
-        try:
-            # Run Playwright in thread pool
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(None, _run_playwright_automation)
-            
-            dom_data = results.get('dom_data', {})
-            history_data = results.get('history_data', [])
-            
-            # Process extracted data
-            if dom_data and dom_data.get('consumer_name') and dom_data.get('amount_due'):
-                logger.info("Using DOM-extracted data")
-                import re
-                amount_str = str(dom_data.get('amount_due', '0'))
-                amount_clean = re.sub(r'[₹$Rs\s]', '', amount_str).replace(',', '')
-                try:
-                    amount_due = float(amount_clean)
-                except:
-                    amount_due = 0.0
-                
-                return {
-                    'consumer_name': dom_data.get('consumer_name', f'Customer {consumer_id}'),
-                    'amount_due': amount_due,
-                    'units_consumed': dom_data.get('units_consumed'),
-                    'due_date': dom_data.get('due_date'),
-                    'status': dom_data.get('status', 'unpaid' if amount_due > 0 else 'paid'),
-                    'history': history_data
-                }
-            
-            # Fallback to HTML parsing if DOM extraction failed
-            logger.warning("DOM extraction incomplete, falling back to Bedrock analysis")
-            page_html = results.get('html', '')
-            if page_html:
-                return await self._analyze_html_with_bedrock(page_html, consumer_id, history_data)
-            
-            raise ValueError("Failed to extract data from page")
-            
-        except Exception as e:
-            logger.error(f"Playwright navigation failed: {e}", exc_info=True)
-            raise
-            
-            # Initialize browser session
-            result = browser_tool.browser(BrowserInput(action={
-                "type": "init_session",
-                "description": "OneWay utility portal automation",
-                "session_name": session_name
-            }))
-            results['init'] = result
-            logger.info(f"Browser session initialized: {result}")
+        def _start_hedged_analysis(page_html: str) -> None:
+            """Start the Bedrock fallback while DOM extraction is still running."""
+            task = loop.create_task(self._analyze_page_content(page_html, consumer_id))
+            # When DOM data wins, cancel() is a no-op on a hedge that already failed;
+            # read its exception here so asyncio never reports it as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            hedge['task'] = task
+        
+        def _run_playwright_automation(page):
+            """Drive the portal on a leased page in the browser pool's worker thread."""
+            results = {}
             
             # Navigate to URL
-            result = browser_tool.browser(BrowserInput(action={
-                "type": "navigate",
-                "session_name": session_name,
-                "url": url
-            }))
-            results['navigate'] = result
-            logger.info(f"Navigated to: {url}")
-            
-            # Small wait for page load
-            import time
-            time.sleep(0.5)
-            logger.info("Page loaded, checking for CAPTCHA...")
-            
-            # Step 1: Check for CAPTCHA presence
-            captcha_result = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": """(function() {
-                    const captchaText = document.querySelector('#captcha-text, #captcha-image, .captcha-image, [id*=captcha]');
-                    const captchaInput = document.querySelector('#captchaValue, input[name=captchaValue], input[placeholder*=captcha i]');
-                    return captchaText && captchaInput ? 'found' : 'none';
-                })();"""
-            }))
-            has_captcha = 'found' in str(captcha_result.get('content', []))
-            logger.info(f"CAPTCHA detection: {has_captcha}")
-            
-            # Step 2: Select search type for e-Challan
-            # Check if page has searchType radio buttons (e-Challan specific)
-            search_type_check = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": """(function() {
-                    const radios = document.querySelectorAll('input[name=searchType]');
-                    return radios.length > 0 ? 'found' : 'none';
-                })();"""
-            }))
-            has_search_type = 'found' in str(search_type_check.get('content', []))
+            logger.info(f"Navigating to {url}")
+            page.goto(url, wait_until='domcontentloaded', timeout=15000)
+            page.wait_for_selector(_SEARCH_INPUT_SELECTOR, state='attached', timeout=5000)
             
-            if has_search_type:
-                if number_plate:
-                    logger.info(f"e-Challan: Using vehicle number search for {number_plate}")
-                    # Select vehicle radio button
-                    vehicle_radio_result = browser_tool.browser(BrowserInput(action={
-                        "type": "evaluate",
-                        "session_name": session_name,
-                        "script": """(function() {
-                            const vehicleRadio = document.querySelector('input[name=searchType][value=vehicle]');
-                            if (vehicleRadio) {
-                                vehicleRadio.checked = true;
-                                vehicleRadio.dispatchEvent(new Event('change', { bubbles: true }));
-                                return 'vehicle-selected';
-                            }
-                            return 'no-vehicle-radio';
-                        })();"""
-                    }))
-                    logger.info(f"Vehicle radio selection: {vehicle_radio_result}")
-                    time.sleep(0.2)
-                else:
-                    logger.info(f"e-Challan: Using challan number search")
-                    # Explicitly select challan radio button and trigger change event
-                    challan_radio_result = browser_tool.browser(BrowserInput(action={
-                        "type": "evaluate",
-                        "session_name": session_name,
-                        "script": """(function() {
-                            const challanRadio = document.querySelector('input[name=searchType][value=challan]');
-                            if (challanRadio) {
-                                challanRadio.checked = true;
-                                challanRadio.dispatchEvent(new Event('change', { bubbles: true }));
-                                return 'challan-selected';
-                            }
-                            return 'no-challan-radio';
-                        })();"""
-                    }))
-                    logger.info(f"Challan radio selection: {challan_radio_result}")
-                    time.sleep(0.2)
-            
-            # Step 4: Fill consumer ID or number plate
+            # Detect CAPTCHA, search type, input and submit button in one round-trip
             search_value = number_plate if number_plate else consumer_id
-            logger.info(f"Attempting to type search value: {search_value}")
-            
-            # Use JavaScript to find and fill the input directly (much faster than trying selectors)
-            type_result = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": f"""(function() {{
-                    const selectors = [
-                        'input[id="searchValue"]',
-                        'input[name="searchValue"]', 
-                        'input[id="consumerNumber"]',
-                        'input[name="consumer_id"]',
-                        'input[name="consumer_no"]',
-                        'input[name="consumerNumber"]',
-                        'input[id="consumer_id"]',
-                        'input[id="consumerId"]',
-                        'input[id="buildingId"]',
-                        'input[name="buildingId"]',
-                        'input[type="text"]'
-                    ];
-                    for (let sel of selectors) {{
-                        const input = document.querySelector(sel);
-                        if (input) {{
-                            input.value = '{search_value}';
-                            input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                            input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                            return 'SUCCESS:' + sel;
-                        }}
-                    }}
-                    return 'FAILED';
-                }})();"""
-            }))
-            
-            typed = False
-            if type_result.get('status') == 'success':
-                content = type_result.get('content', [])
-                if content and len(content) > 0:
-                    result_text = content[0].get('text', '')
-                    if 'SUCCESS' in result_text:
-                        selector_used = result_text.split(':')[-1].strip() if ':' in result_text else 'unknown'
-                        logger.info(f"Typed search value ({search_value}) using selector: {selector_used}")
-                        typed = True
-            
-            if not typed:
-                logger.warning("Could not find search value input field")
-            
-            # Step 5: Handle CAPTCHA if present
-            if has_captcha:
-                logger.info("CAPTCHA detected, attempting solve...")
-                # Extract CAPTCHA text/image
-                captcha_extract = browser_tool.browser(BrowserInput(action={
-                    "type": "evaluate",
-                    "session_name": session_name,
-                    "script": """(function() {
-                        const txt = document.querySelector('#captcha-text');
-                        if (txt) return txt.textContent.trim();
-                        const img = document.querySelector('#captcha-image, .captcha-image');
-                        if (img && img.querySelector('svg text')) {
-                            return img.querySelector('svg text').textContent.trim();
-                        }
-                        return '';
-                    })();"""
-                }))
-                
-                captcha_value = ''
-                if captcha_extract.get('status') == 'success':
-                    content = captcha_extract.get('content', [])
-                    if content and len(content) > 0:
-                        raw = content[0].get('text', '')
-                        # Strip prefix if evaluate returns "Evaluation result (fixed): VALUE"
-                        if 'Evaluation result' in raw:
-                            captcha_value = raw.split(':')[-1].strip()
-                        else:
-                            captcha_value = raw.strip()
+            search_type = 'vehicle' if number_plate else 'challan'
+            probe = page.evaluate(_FORM_PROBE_SCRIPT, search_type)
+            
+            logger.info(f"CAPTCHA detection: {'found' if probe['has_captcha'] else 'none'}")
+            
+            # Handle e-Challan search type selection
+            if probe['search_type']:
+                logger.info(f"Selecting {search_type} search")
+                page.locator(f'input[name=searchType][value={search_type}]').check(timeout=2000)
+            
+            # Fill search value (consumer ID or number plate)
+            logger.info(f"Entering search value: {search_value}")
+            if probe['typed_selector']:
+                page.locator('[data-oneway-fill]').fill(search_value, timeout=2000)
+                logger.debug("Typed value using selector: %s", probe['typed_selector'])
+            
+            # Handle CAPTCHA if present
+            if probe['has_captcha']:
+                logger.info("Solving CAPTCHA...")
+                captcha_value = probe['captcha_value']
+                logger.debug("CAPTCHA value: %s", captcha_value)
                 
-                logger.info(f"Extracted CAPTCHA text: '{captcha_value}'")
-                
-                # Check if it's a math problem (e.g., "4 + 1", "10 - 3", "2 * 5")
+                # Handle math CAPTCHA
                 if captcha_value and any(op in captcha_value for op in ['+', '-', '*', '/', 'x', '×']):
                     try:
-                        # Replace multiplication symbols
-                        math_expr = captcha_value.replace('x', '*').replace('×', '*').replace('÷', '/')
-                        # Evaluate the math expression safely
-                        result = eval(math_expr, {"__builtins__": {}}, {})
-                        captcha_value = str(int(result))
-                        logger.info(f"Solved math CAPTCHA: {math_expr} = {captcha_value}")
+                        solved = _solve_math_captcha(captcha_value)
+                        logger.debug("Solved math CAPTCHA: %s = %s", captcha_value, solved)
+                        captcha_value = solved
                     except Exception as e:
-                        logger.warning(f"Failed to solve math CAPTCHA '{captcha_value}': {e}")
+                        logger.warning(f"Failed to solve math CAPTCHA: {e}")
                 
                 if captcha_value:
-                    # Type CAPTCHA using JavaScript (faster than selector-based type)
-                    captcha_input_result = browser_tool.browser(BrowserInput(action={
-                        "type": "evaluate",
-                        "session_name": session_name,
-                        "script": f"""(function() {{
-                            const input = document.querySelector('#captchaValue') || 
-                                         document.querySelector('input[name="captchaValue"]') ||
-                                         document.querySelector('.captcha-input');
-                            if (input) {{
-                                input.value = '{captcha_value}';
-                                input.dispatchEvent(new Event('input', {{ bubbles: true }}));
-                                input.dispatchEvent(new Event('change', {{ bubbles: true }}));
-                                return 'SUCCESS';
-                            }}
-                            return 'FAILED';
-                        }})();"""
-                    }))
-                    
-                    if captcha_input_result.get('status') == 'success':
-                        content = captcha_input_result.get('content', [])
-                        if content and 'SUCCESS' in content[0].get('text', ''):
-                            logger.info("CAPTCHA typed successfully")
-                        else:
-                            logger.warning(f"CAPTCHA input field not found")
-                    else:
-                        logger.warning(f"CAPTCHA input failed: {captcha_input_result}")
-                else:
-                    logger.warning("Could not extract CAPTCHA value from page")
-            
-            # Step 6: Click submit button using JavaScript (faster than trying selectors)
-            submit_result = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": """(function() {
-                    const selectors = [
-                        'button[type="submit"]',
-                        'input[type="submit"]',
-                        '.btn-primary',
-                        '.submit-btn',
-                        '#submit',
-                        'button'
-                    ];
-                    for (let sel of selectors) {
-                        const btn = document.querySelector(sel);
-                        if (btn) {
-                            btn.click();
-                            return 'SUCCESS:' + sel;
-                        }
-                    }
-                    return 'FAILED';
-                })();"""
-            }))
-            
-            if submit_result.get('status') == 'success':
-                content = submit_result.get('content', [])
-                if content and 'SUCCESS' in content[0].get('text', ''):
-                    selector_used = content[0].get('text', '').split(':')[-1].strip() if ':' in content[0].get('text', '') else 'unknown'
-                    logger.info(f"Clicked submit using selector: {selector_used}")
-                else:
-                    logger.warning("Submit button not found on page")
-            
-            # Wait for results section to appear (JavaScript rendering)
-            logger.info("Waiting for results to load...")
-            time.sleep(2)
-            
-            # Check if bill-view section is visible (wait up to 3 more seconds)
-            for i in range(3):
-                visibility_check = browser_tool.browser(BrowserInput(action={
-                    "type": "evaluate",
-                    "session_name": session_name,
-                    "script": """(function() {
-                        const billView = document.getElementById('bill-view');
-                        if (billView && !billView.classList.contains('hidden')) {
-                            return 'VISIBLE';
-                        }
-                        return 'HIDDEN';
-                    })();"""
-                }))
-                if visibility_check.get('status') == 'success':
-                    content = visibility_check.get('content', [])
-                    if content and 'VISIBLE' in content[0].get('text', ''):
-                        logger.info("Results section is now visible")
-                        time.sleep(0.5)  # Extra time for JavaScript to populate DOM
-                        break
-                time.sleep(1)
-            
-            logger.info("Getting page HTML after submit...")
-            
-            # First, try to extract structured data directly from DOM elements (faster and more reliable)
-            data_extract = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": """(function() {
-                    const data = {};
-                    
-                    // Consumer/Owner name - try multiple selectors for different sites
-                    const nameSelectors = [
-                        '#consumer-name', '#display-owner', '#owner-name', '#property-owner',
-                        '#bill-name', '.consumer-name', '.owner-name'
-                    ];
-                    for (let sel of nameSelectors) {
-                        const nameEl = document.querySelector(sel);
-                        if (nameEl && nameEl.textContent.trim()) {
-                            data.consumer_name = nameEl.textContent.trim();
-                            break;
-                        }
-                    }
-                    
-                    // Amount - try different patterns for different sites
-                    const amountSelectors = [
-                        '#display-fine',       // e-Challan
-                        '#display-amount',     // Generic
-                        '#bill-amount',        // Bills
-                        '#tax-amount'          // K-Smart
-                    ];
-                    for (let sel of amountSelectors) {
-                        const amountEl = document.querySelector(sel);
-                        if (amountEl && amountEl.textContent.trim()) {
-                            data.amount_due = amountEl.textContent.trim();
-                            break;
-                        }
-                    }
-                    
-                    // Status - try different selectors
-                    const statusSelectors = ['#display-status', '#bill-status', '#payment-status'];
-                    for (let sel of statusSelectors) {
-                        const statusEl = document.querySelector(sel);
-                        if (statusEl && statusEl.textContent.trim()) {
-                            const statusText = statusEl.textContent.trim().toLowerCase();
-                            if (statusText.includes('paid') || statusText.includes('settled')) {
-                                data.status = 'paid';
-                            }
-                            break;
-                        }
-                    }
-                    
-                    // Extract from details div (works for KSEB, KWA, e-Challan, K-Smart)
-                    // Only if we didn't already find the data above
-                    if (!data.amount_due || !data.consumer_name) {
-                        const detailsSelectors = ['#bill-details', '#challan-details', '#property-details', '.details'];
-                        for (let detailsSel of detailsSelectors) {
-                            const detailsDiv = document.querySelector(detailsSel);
-                            if (detailsDiv) {
-                                const divs = detailsDiv.querySelectorAll('div');
-                                divs.forEach(div => {
-                                    const label = div.querySelector('span');
-                                    const value = div.querySelector('strong');
-                                    if (label && value) {
-                                        const labelText = label.textContent.trim().toLowerCase();
-                                        const valueText = value.textContent.trim();
-                                        
-                                        // Amount patterns (bill amount, fine amount, tax amount)
-                                        if ((labelText.includes('bill amount') || labelText.includes('amount') || 
-                                            labelText.includes('fine') || labelText.includes('tax')) && 
-                                            !data.amount_due) {
-                                            data.amount_due = valueText;
-                                        } 
-                                        // Due date
-                                        else if ((labelText.includes('due date') || labelText.includes('date')) && 
-                                                 !data.due_date) {
-                                            data.due_date = valueText;
-                                        } 
-                                        // Units/consumption
-                                        else if ((labelText.includes('unit') || labelText.includes('consumption') || 
-                                                 labelText.includes('usage')) && !data.units_consumed) {
-                                            data.units_consumed = valueText;
-                                        }
-                                    }
-                                });
-                                break;
-                            }
-                        }
-                    }
-                    
-                    // Check for paid/settled status banners
-                    const paidSelectors = ['#paid-banner', '#settled-banner', '.paid-banner', '.settled-banner'];
-                    for (let sel of paidSelectors) {
-                        const banner = document.querySelector(sel);
-                        if (banner && !banner.classList.contains('hidden')) {
-                            data.status = 'paid';
-                            break;
-                        }
-                    }
-                    
-                    return JSON.stringify(data);
-                })();"""
-            }))
-            
-            extracted_data = {}
-            if data_extract.get('status') == 'success':
-                content = data_extract.get('content', [])
-                if content and len(content) > 0:
-                    try:
-                        data_text = content[0].get('text', '{}')
-                        logger.info(f"Raw DOM extraction result: {data_text}")
-                        # Remove "Evaluation result:" prefix if present
-                        if 'Evaluation result' in data_text:
-                            data_text = data_text.split(':', 1)[-1].strip()
-                        extracted_data = json.loads(data_text)
-                        logger.info(f"Parsed structured data from DOM: {extracted_data}")
-                        results['dom_data'] = extracted_data
-                    except Exception as e:
-                        logger.warning(f"Failed to parse DOM data: {e}")
-            
-            # Extract historical billing data from bill-list
-            logger.info("Extracting historical billing data...")
-            history_extract = browser_tool.browser(BrowserInput(action={
-                "type": "evaluate",
-                "session_name": session_name,
-                "script": """(function() {
-                    const historyData = [];
-                    const billList = document.querySelector('#bill-list');
-                    
-                    if (billList) {
-                        // The bills are rendered as buttons with class 'bill-item'
-                        const billItems = billList.querySelectorAll('.bill-item, button');
-                        
-                        billItems.forEach(item => {
-                            // Structure: button > (div[left], div[right])
-                            // Left div: strong (bill ID), span (due date)
-                            // Right div: strong (amount), span.pill (status)
-                            
-                            const leftDiv = item.querySelector('div:first-child');
-                            const rightDiv = item.querySelector('div:last-child');
-                            
-                            if (leftDiv && rightDiv) {
-                                const billId = leftDiv.querySelector('strong');
-                                const dueSpan = leftDiv.querySelector('span');
-                                const amountStrong = rightDiv.querySelector('strong');
-                                const statusSpan = rightDiv.querySelector('span.pill, span');
-                                
-                                const historyItem = {};
-                                
-                                // Extract date from "Due YYYY-MM-DD" or bill ID
-                                if (dueSpan && dueSpan.textContent) {
-                                    const dueText = dueSpan.textContent.trim();
-                                    // Extract date from "Due 2026-01-15" format
-                                    const dateMatch = dueText.match(/\\d{4}-\\d{2}-\\d{2}/);
-                                    historyItem.date = dateMatch ? dateMatch[0] : dueText.replace('Due ', '');
-                                } else if (billId) {
-                                    historyItem.date = billId.textContent.trim();
-                                }
-                                
-                                // Extract amount
-                                if (amountStrong && amountStrong.textContent) {
-                                    historyItem.amount = amountStrong.textContent.trim();
-                                }
-                                
-                                // Extract status
-                                if (statusSpan && statusSpan.textContent) {
-                                    historyItem.status = statusSpan.textContent.trim();
-                                }
-                                
-                                // Only add if we have amount (most important field)
-                                if (historyItem.amount) {
-                                    historyData.push(historyItem);
-                                }
-                            }
-                        });
-                    }
-                    
-                    return JSON.stringify({
-                        found: historyData.length,
-                        data: historyData,
-                        billListExists: !!billList
-                    });
-                })();"""
-            }))
-            
-            history_list = []
-            if history_extract.get('status') == 'success':
-                content = history_extract.get('content', [])
-                if content and len(content) > 0:
-                    try:
-                        history_text = content[0].get('text', '{}')
-                        if 'Evaluation result' in history_text:
-                            history_text = history_text.split(':', 1)[-1].strip()
-                        history_response = json.loads(history_text)
-                        
-                        # Log debugging info
-                        logger.info(f"History extraction debug - billListExists: {history_response.get('billListExists')}, found: {history_response.get('found')} items")
-                        if history_response.get('billListHTML'):
-                            logger.info(f"bill-list HTML sample: {history_response.get('billListHTML')[:200]}")
-                        
-                        # Extract the actual history data
-                        history_list = history_response.get('data', [])
-                        if history_list:
-                            logger.info(f"Extracted {len(history_list)} historical bills from DOM")
-                        else:
-                            logger.warning("No historical bills found in bill-list")
-                        results['history_data'] = history_list
-                    except Exception as e:
-                        logger.warning(f"Failed to parse history data: {e}")
-            
-            # Get page HTML
-            html_result = browser_tool.browser(BrowserInput(action={
-                "type": "get_html",
-                "session_name": session_name
-            }))
-            
-            page_html = ''
-            if html_result.get('status') == 'success':
-                content = html_result.get('content', [])
-                if content and isinstance(content, list) and len(content) > 0:
-                    page_html = content[0].get('text', '')
+                    page.locator('[data-oneway-captcha]').fill(captcha_value, timeout=2000)
+            
+            # Click submit button
+            logger.info("Clicking submit...")
+            if probe['submit_selector']:
+                # The results script below owns the wait for the bill view, so
+                # skip Playwright's own post-click navigation settle
+                page.locator('[data-oneway-submit]').click(timeout=5000, no_wait_after=True)
+                logger.debug("Clicked submit using: %s", probe['submit_selector'])
+            
+            # Wait for results
+            logger.info("Waiting for results...")
+            if settings.enable_hedged_bedrock:
+                try:
+                    page.wait_for_selector(_RESULTS_SELECTOR, timeout=_RESULTS_TIMEOUT_MS)
+                except PlaywrightTimeoutError:
+                    pass
+                results['html'] = page.evaluate(_BILL_HTML_SCRIPT, _BILL_HTML_MAX_CHARS)
+                loop.call_soon_threadsafe(_start_hedged_analysis, results['html'])
+            
+            # Await the results view in-page, then extract bill fields,
+            # history and (if needed) the bill markup, all in one round-trip
+            logger.info("Extracting data from page...")
+            scraped = page.evaluate(_RESULTS_SCRIPT, {
+                'timeoutMs': _RESULTS_TIMEOUT_MS,
+                # Hedged mode has already captured the markup
+                'htmlMaxChars': 0 if 'html' in results else _BILL_HTML_MAX_CHARS,
+            })
+            if scraped['visible']:
+                logger.info("Results visible")
+            else:
+                logger.warning("Results view did not appear, extracting anyway")
             
-            results['html'] = page_html
-            logger.info(f"Extracted page HTML: {len(page_html)} chars")
+            logger.debug("Extracted DOM data: %s", scraped['dom_data'])
+            results['dom_data'] = scraped['dom_data']
             
-            # Debug: Log the actual HTML content
-            logger.info(f"HTML Content Preview: {page_html[:1000]}")
+            logger.info("Extracted %d historical bills", len(scraped['history_data']))
+            results['history_data'] = scraped['history_data']
             
-            # Check if page shows an error or "not found" message
-            if page_html:
-                page_lower = page_html.lower()
-                if any(err in page_lower for err in ['not found', 'invalid', 'error', 'incorrect captcha', 'wrong captcha']):
-                    logger.warning(f"Page may contain error message. HTML snippet: {page_html[:500]}")
-            
-            # Close session
-            try:
-                browser_tool.browser(BrowserInput(action={
-                    "type": "close",
-                    "session_name": session_name
-                }))
-            except Exception:
-                pass
+            if scraped['html']:
+                results['html'] = scraped['html']
             
             return results
         
         try:
-            # Run browser automation in thread pool to avoid uvloop conflict
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(None, _run_browser_automation)
+            # Run Playwright on a pooled browser
+            results = await get_browser_pool().run(_run_playwright_automation)
             
-            page_html = results.get('html', '')
             dom_data = results.get('dom_data', {})
             history_data = results.get('history_data', [])
             
-            # If we have DOM-extracted data with required fields, use it directly
+            # Process extracted data
             if dom_data and dom_data.get('consumer_name') and dom_data.get('amount_due'):
-                logger.info("Using DOM-extracted data (faster, more reliable)")
-                # Parse amount if it's a string with currency symbols
+                logger.info("Using DOM-extracted data")
+                if 'task' in hedge:
+                    hedge['task'].cancel()
                 amount_str = str(dom_data.get('amount_due', '0'))
-                import re
-                # Remove currency symbols and thousand separators, but keep decimal point
-                amount_clean = re.sub(r'[₹$Rs\s]', '', amount_str)  # Remove currency symbols and spaces
-                amount_clean = amount_clean.replace(',', '')  # Remove thousand separators
+                amount_clean = amount_str.translate(_AMOUNT_STRIP)
                 try:
                     amount_due = float(amount_clean)
                 except:
@@ -999,27 +1180,43 @@ class AgentCoreBrowserAgent:
                     'history': history_data
                 }
             
-            # Fallback to Nova Pro if DOM extraction didn't find the data
-            logger.info("DOM extraction incomplete, falling back to Nova Pro analysis")
-            extracted_data = await self._analyze_page_content(page_html, consumer_id)
+            # Fallback to HTML parsing if DOM extraction failed
+            logger.warning("DOM extraction incomplete, falling back to Bedrock analysis")
+            page_html = results.get('html', '')
+            if page_html and _PAGE_ERROR_RE.search(page_html):
+                logger.warning("Page may contain error message. HTML snippet: %s", page_html[:500])
+            
+            if 'task' in hedge:
+                extracted = await hedge['task']
+                extracted.setdefault('history', history_data)
+                return extracted
+            
+            if page_html:
+                return await self._analyze_html_with_bedrock(page_html, consumer_id, history_data)
             
-            return extracted_data
+            raise ValueError("Failed to extract data from page")
             
         except Exception as e:
-            logger.error(f"Browser navigation failed: {e}")
-            # Fallback to Nova Pro vision
-            return await self._navigate_with_nova_vision(url, instructions, consumer_id, 15)
+            if 'task' in hedge:
+                hedge['task'].cancel()
+            logger.error(f"Playwright navigation failed: {e}", exc_info=True)
+            raise
     
     async def _analyze_page_content(self, page_text: str, consumer_id: str) -> Dict[str, Any]:
         """
         Use Nova Pro to analyze extracted page content and structure the data.
         This is safe because we're only analyzing text, not automating navigation.
         """
+        # Spend the prompt budget on visible text rather than tags and indentation
+        page_text = _MARKUP_RE.sub(' ', page_text).strip()[:_PROMPT_PAGE_CHARS]
+        if not page_text:
+            raise ValueError("No page content to analyze")
+        
         prompt = f"""
 Analyze this utility bill page HTML/text and extract the billing information.
 
 Page Content:
-{page_text[:4000]}
+{page_text}
 
 Consumer ID: {consumer_id}
 
@@ -1056,28 +1253,40 @@ Example: {{"consumer_name":"Rajesh Kumar","amount_due":1234.50,"units_consumed":
         }
         
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.runtime_client.invoke_model(
+            if AIOBOTO3_AVAILABLE:
+                client = await _get_async_runtime_client()
+                response = await client.invoke_model_with_response_stream(
                     modelId=self.NOVA_PRO_MODEL,
                     contentType="application/json",
                     accept="application/json",
-                    body=json.dumps(request_body)
+                    body=orjson.dumps(request_body),
+                    **self._performance_kwargs()
+                )
+                response_text = await _collect_streamed_json_text_async(response['body'])
+            else:
+                response_text = await asyncio.get_running_loop().run_in_executor(
+                    _BEDROCK_EXECUTOR, self._stream_nova_json_text, orjson.dumps(request_body)
                 )
-            )
-            
-            response_body = json.loads(response['body'].read())
-            output = response_body.get('output', {})
-            message = output.get('message', {})
-            content = message.get('content', [])
-            
-            response_text = content[0].get('text', '') if content else ''
             return self._parse_extraction_result(response_text)
             
         except Exception as e:
             logger.error(f"Content analysis failed: {e}")
             raise RuntimeError(f"Content analysis failed: {e}")
     
+    async def _analyze_html_with_bedrock(
+        self,
+        page_html: str,
+        consumer_id: str,
+        history_data: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Fallback for incomplete DOM extraction: analyze the captured page HTML
+        with Nova Pro and keep the history already read from the DOM.
+        """
+        extracted = await self._analyze_page_content(page_html, consumer_id)
+        extracted.setdefault('history', history_data)
+        return extracted
+    
     async def _navigate_with_nova_vision(
         self,
         url: str,
@@ -1092,11 +1301,10 @@ Example: {{"consumer_name":"Rajesh Kumar","amount_due":1234.50,"units_consumed":
         
         page_text: str = ""
         try:
-            async with httpx.AsyncClient(timeout=30) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                page_text = resp.text
-                logger.info("Fetched page content for vision fallback")
+            resp = await get_http_client().get(url)
+            resp.raise_for_status()
+            page_text = resp.text
+            logger.info("Fetched page content for vision fallback")
         except Exception as fetch_error:
             logger.warning(f"Failed to fetch page content for vision fallback: {fetch_error}")
 
@@ -1147,23 +1355,10 @@ Return ONLY the JSON, no other text.
         }
         
         try:
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.runtime_client.invoke_model(
-                    modelId=self.NOVA_PRO_MODEL,
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(request_body)
-                )
+            response_text = await asyncio.get_running_loop().run_in_executor(
+                _BEDROCK_EXECUTOR, self._stream_nova_json_text, orjson.dumps(request_body)
             )
             
-            response_body = json.loads(response['body'].read())
-            output = response_body.get('output', {})
-            message = output.get('message', {})
-            content = message.get('content', [])
-            
-            response_text = content[0].get('text', '') if content else ''
-            
             return self._parse_extraction_result(response_text)
             
         except Exception as e:
@@ -1172,683 +1367,222 @@ Return ONLY the JSON, no other text.
     
     def _parse_extraction_result(self, response_text: str) -> Dict[str, Any]:
         """Parse JSON from agent response."""
-        import re
-        
         # Try to find JSON in the response
+        start = response_text.find('{')
+        if start < 0:
+            raise ValueError("No JSON object found in extraction response")
+
         try:
-            # Look for JSON block
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                parsed = json.loads(json_match.group())
-                if not isinstance(parsed, dict):
-                    raise ValueError("Extraction payload is not a JSON object")
+            parsed, _end = _JSON_DECODER.raw_decode(response_text, start)
+        except json.JSONDecodeError:
+            raise ValueError("Failed to parse extraction JSON")
 
-                if parsed.get("error"):
-                    raise ValueError(f"Extraction failed: {parsed.get('error')}")
+        if not isinstance(parsed, dict):
+            raise ValueError("Extraction payload is not a JSON object")
 
-                if "consumer_name" not in parsed or "amount_due" not in parsed:
-                    raise ValueError("Extraction missing required fields: consumer_name, amount_due")
+        if parsed.get("error"):
+            raise ValueError(f"Extraction failed: {parsed.get('error')}")
 
-                # Allow fallback consumer names like "Customer 12345" but reject truly empty ones
-                consumer_name = parsed.get("consumer_name", "").strip()
-                if not consumer_name or consumer_name in ("Unknown", ""):
-                    raise ValueError("Extraction returned empty consumer_name")
+        if "consumer_name" not in parsed or "amount_due" not in parsed:
+            raise ValueError("Extraction missing required fields: consumer_name, amount_due")
 
-                # Parse amount_due - handle currency symbols and commas
-                try:
-                    amount_str = str(parsed.get("amount_due", "0"))
-                    # Remove currency symbols and spaces, then remove thousand separators
-                    amount_cleaned = re.sub(r'[₹$Rs\s]', '', amount_str)
-                    amount_cleaned = amount_cleaned.replace(',', '')  # Remove commas but keep decimal point
-                    parsed["amount_due"] = float(amount_cleaned)
-                except Exception as exc:
-                    raise ValueError(f"Extraction returned non-numeric amount_due: {parsed.get('amount_due')}") from exc
-
-                return parsed
-        except json.JSONDecodeError:
-            raise ValueError("Failed to parse extraction JSON")
+        # Allow fallback consumer names like "Customer 12345" but reject truly empty ones
+        consumer_name = parsed.get("consumer_name", "").strip()
+        if not consumer_name or consumer_name in ("Unknown", ""):
+            raise ValueError("Extraction returned empty consumer_name")
+
+        # Parse amount_due - handle currency symbols and commas
+        try:
+            amount_str = str(parsed.get("amount_due", "0"))
+            # Remove currency symbols, spaces and thousand separators
+            parsed["amount_due"] = float(amount_str.translate(_AMOUNT_STRIP))
+        except Exception as exc:
+            raise ValueError(f"Extraction returned non-numeric amount_due: {parsed.get('amount_due')}") from exc
 
-        raise ValueError("No JSON object found in extraction response")
+        return parsed
     
     async def capture_qr_code(self, url: str, consumer_id: str) -> Optional[str]:
         """
         Navigate to payment page and capture QR code using Playwright.
-        Uses Bedrock Nova Pro to extract and crop the QR code from the screenshot.
         
         Returns:
-            Base64-encoded QR code image (cropped) or None
+            Base64-encoded full-page screenshot showing the QR, or None
         """
         if not BROWSER_AVAILABLE:
             logger.warning("QR capture requires Playwright browser")
             return None
         
-        def _capture_qr():
-            """Run QR capture using Playwright in separate sync context."""
-            from playwright.sync_api import sync_playwright
-            import base64
-            
-            def _shoot(p):
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                logger.info(f"Navigating to payment page: {url}")
-                page.goto(url, wait_until='networkidle', timeout=30000)
-                page.wait_for_timeout(1000)
-
-                target_page = page  # May switch if gateway opens in a popup/new tab
-                current_page = page
-
-                # All four sites now require an explicit Pay by UPI click before the QR renders
-                def _click_with_wait_on(page_obj, click_fn):
-                    """Click and wait for popup or navigation, returning the active page."""
-                    import time
-                    before_pages = set(page_obj.context.pages)
-
-                    # 1) Explicit popup (window.open) from the clicked element
-                    try:
-                        with page_obj.expect_popup(timeout=8000) as popup_info:
-                            click_fn()
-                        new_page = popup_info.value
-                        new_page.wait_for_load_state('load', timeout=15000)
-                        return new_page, "popup"
-                    except Exception:
-                        pass
-
-                    # 2) New tab opened in same context (not caught as popup)
-                    try:
-                        with page_obj.context.expect_page(timeout=8000) as page_info:
-                            click_fn()
-                        new_page = page_info.value
-                        new_page.wait_for_load_state('load', timeout=15000)
-                        return new_page, "new_tab"
-                    except Exception:
-                        pass
-
-                    # 3) Same-page navigation
-                    try:
-                        with page_obj.expect_navigation(wait_until="networkidle", timeout=20000):
-                            click_fn()
-                        return page_obj, "navigation"
-                    except Exception:
-                        pass
-
-                    # 4) No observable nav; assume same page
-                    click_fn()
-                    # 5) Late-discovered tab/window: poll for new page in context
-                    deadline = time.time() + 10
-                    while time.time() < deadline:
-                        for p in page_obj.context.pages:
-                            if p not in before_pages:
-                                try:
-                                    p.wait_for_load_state('load', timeout=15000)
-                                except Exception:
-                                    pass
-                                return p, "late_tab"
-                        time.sleep(0.25)
-
-                    return page_obj, "same"
-
-                def _click_pay_by_upi(active_page):
-                    import re
-
-                    def _try_click_once():
+        if _qr_capture_slots.locked():
+            raise QRCaptureBusyError("All payment browsers are busy, please retry shortly")
+        
+        def _shoot(page):
+            """Run the payment flow on a pooled page and return a full-page screenshot."""
+            # Routed on the context so gateway popups are covered too
+            page.context.route('**/*', _block_trackers)
+            logger.info(f"Navigating to payment page: {url}")
+            page.goto(url, wait_until='networkidle', timeout=30000)
+            if consumer_id:
+                _wait_until_ready(page, _QR_CONSUMER_INPUT_SELECTOR, timeout_ms=5000)
+
+            target_page = page  # May switch if gateway opens in a popup/new tab
+            current_page = page
+
+            # All four sites now require an explicit Pay by UPI click before the QR renders
+            def _click_with_wait_on(page_obj, click_fn):
+                """
+                Click once via click_fn, which returns how it matched (falsy if nothing
+                was clicked). Returns ((landing_page, wait_mode), matched_via).
+                """
+                context = page_obj.context
+                opened = []
+                navigated = []
+                on_page = opened.append
+
+                def on_navigated(frame):
+                    if frame == page_obj.main_frame:
+                        navigated.append(frame.url)
+
+                context.on('page', on_page)
+                page_obj.on('framenavigated', on_navigated)
+                try:
+                    via = click_fn()
+                    if not via:
+                        return (None, None), None
+                    # Wait for the click to open a page (popup/new tab via the
+                    # context listener) or commit a navigation in this tab, up
+                    # to a short grace window. The sync API only dispatches
+                    # events during its own calls, so block inside Playwright
+                    # in small slices rather than sleeping.
+                    deadline = time.monotonic() + 1.5
+                    while not opened and not navigated and time.monotonic() < deadline:
+                        page_obj.wait_for_timeout(50)
+                    if navigated and not opened:
+                        # Load state resets when the navigation commits, so
+                        # this now waits for the new document, not the old one
                         try:
-                            btn = active_page.get_by_role("button", name=re.compile("pay by upi", re.IGNORECASE)).first
-                            if btn.count() > 0:
-                                return _click_with_wait_on(active_page, lambda: btn.click(timeout=5000)), "role"
-                        except Exception:
+                            page_obj.wait_for_load_state('domcontentloaded', timeout=6000)
+                        except PlaywrightTimeoutError:
                             pass
+                finally:
+                    context.remove_listener('page', on_page)
+                    page_obj.remove_listener('framenavigated', on_navigated)
 
-                        try:
-                            btn = active_page.locator("text=/pay by upi/i").first
-                            if btn.count() > 0:
-                                return _click_with_wait_on(active_page, lambda: btn.click(timeout=5000)), "text"
-                        except Exception:
-                            pass
-
-                        try:
-                            return _click_with_wait_on(
-                                active_page,
-                                lambda: active_page.evaluate(
-                                    """
-                                    () => {
-                                        const candidates = Array.from(document.querySelectorAll('button, a, div, span'));
-                                        for (const el of candidates) {
-                                            const txt = (el.innerText || el.textContent || '').trim().toLowerCase();
-                                            if (txt.includes('pay by upi')) {
-                                                el.click();
-                                                return true;
-                                            }
-                                        }
-                                        return false;
-                                    }
-                                    """
-                                )
-                            ), "dom"
-                        except Exception:
-                            pass
+                if not opened:
+                    return (page_obj, "navigation" if navigated else "same"), via
 
+                new_page = opened[0]
+                try:
+                    new_page.wait_for_load_state('load', timeout=15000)
+                except PlaywrightTimeoutError:
+                    pass
+                return (new_page, "popup_or_tab"), via
+
+            def _click_matching(active_page, role, text=None, fallback=None, loose=None):
+                def _click():
+                    via = active_page.evaluate(
+                        _CLICK_MATCH_SCRIPT, {'role': role, 'text': text, 'fallback': fallback, 'loose': loose}
+                    )
+                    if via:
+                        # Playwright waits for the tagged control to be visible,
+                        # enabled and unobscured, scrolling it into view first;
+                        # the post-click settle is _click_with_wait_on's job
+                        active_page.locator(_CLICK_TARGET_SELECTOR).first.click(timeout=5000, no_wait_after=True)
+                    return via
+                return _click_with_wait_on(active_page, _click)
+
+            def _click_pay_by_upi(active_page, upi_waited):
+                # Only wait for the button if the submit step has not already
+                # done so; a single click attempt is cheap when it is absent
+                if not upi_waited:
+                    try:
+                        active_page.locator(_UPI_BUTTON_SELECTOR).first.wait_for(state='visible', timeout=2000)
+                    except PlaywrightTimeoutError:
                         return (None, None), None
+                return _click_matching(active_page, _PAY_BY_UPI_PATTERN)
 
-                    # Poll briefly for the button to render after submit/navigation
-                    for _ in range(5):
-                        result = _try_click_once()
-                        if result[1]:
-                            return result
-                        active_page.wait_for_timeout(800)
-
-                    return (None, None), None
-
-                def _fill_consumer_and_submit(active_page):
-                    if consumer_id:
-                        typed_selector = active_page.evaluate(
-                            """
-                            (value) => {
-                                const selectors = [
-                                    'input[id="consumerNumber"]', 'input[name="consumerNumber"]',
-                                    'input[id="consumer_id"]', 'input[name="consumer_id"]',
-                                    'input[id="buildingId"]', 'input[name="buildingId"]',
-                                    'input[id="searchValue"]', 'input[name="searchValue"]',
-                                    'input[type="text"]'
-                                ];
-                                for (const sel of selectors) {
-                                    const input = document.querySelector(sel);
-                                    if (input) {
-                                        input.value = value;
-                                        input.dispatchEvent(new Event('input', { bubbles: true }));
-                                        input.dispatchEvent(new Event('change', { bubbles: true }));
-                                        return sel;
-                                    }
-                                }
-                                return null;
-                            }
-                            """,
-                            consumer_id
-                        )
-                        if typed_selector:
-                            logger.info(f"Entered consumer id using selector: {typed_selector}")
-                        else:
-                            logger.warning("Could not find consumer input to populate before payment")
-
-                    def _click_submit(active_page):
-                        import re
-                        try:
-                            btn = active_page.get_by_role("button", name=re.compile("proceed|continue|pay|view bill|submit|search", re.IGNORECASE)).first
-                            if btn.count() > 0:
-                                return _click_with_wait_on(active_page, lambda: btn.click(timeout=5000)), "role"
-                        except Exception:
-                            pass
+            def _fill_consumer_and_submit(active_page):
+                """Returns the active page and whether it already waited for Pay by UPI."""
+                # Nothing to look up without a consumer id; go straight to Pay by UPI
+                if not consumer_id:
+                    return active_page, False
 
-                        try:
-                            btn = active_page.locator("text=/proceed|continue|pay now|view bill|submit|search/i").first
-                            if btn.count() > 0:
-                                return _click_with_wait_on(active_page, lambda: btn.click(timeout=5000)), "text"
-                        except Exception:
-                            pass
+                typed_selector = active_page.evaluate(_QR_CONSUMER_FILL_SCRIPT, consumer_id)
+                if typed_selector:
+                    logger.info(f"Entered consumer id using selector: {typed_selector}")
+                else:
+                    logger.warning("Could not find consumer input to populate before payment")
 
-                        try:
-                            btn = active_page.locator("input[type='submit'], button[type='submit']").first
-                            if btn.count() > 0:
-                                return _click_with_wait_on(active_page, lambda: btn.click(timeout=5000)), "submit"
-                        except Exception:
-                            pass
+                try:
+                    (submitted_page, submit_mode), submit_source = _click_matching(
+                        active_page, _SUBMIT_PATTERN, _SUBMIT_TEXT_PATTERN, _SUBMIT_INPUT_SELECTOR, _SUBMIT_PATTERN
+                    )
+                except Exception:
+                    (submitted_page, submit_mode) = (None, None)
+                    submit_source = None
 
-                        try:
-                            return _click_with_wait_on(
-                                active_page,
-                                lambda: active_page.evaluate(
-                                    """
-                                    () => {
-                                        const selectors = ['button', 'a', 'div', 'span', 'input[type=submit]'];
-                                        for (const sel of selectors) {
-                                            for (const el of document.querySelectorAll(sel)) {
-                                                const txt = (el.innerText || el.textContent || '').trim().toLowerCase();
-                                                if (txt.includes('proceed') || txt.includes('continue') || txt.includes('pay') || txt.includes('view bill') || txt.includes('submit') || txt.includes('search')) {
-                                                    el.click();
-                                                    return true;
-                                                }
-                                            }
-                                        }
-                                        return false;
-                                    }
-                                    """
-                                )
-                            ), "dom"
-                        except Exception:
-                            pass
+                if not submit_source:
+                    return active_page, False
 
-                        return (None, None), None
+                active_page = submitted_page or active_page
+                logger.info(f"Submitted details via {submit_source} locator; wait_mode={submit_mode}")
+                # The Pay by UPI button only renders once the bill lookup has
+                # returned, so it is the readiness signal; background beacons
+                # must not hold this up via networkidle
+                if not _wait_until_ready(active_page, _UPI_BUTTON_SELECTOR, idle_ms=0):
+                    logger.warning("'Pay by UPI' button not visible after submit; continuing")
+                return active_page, True
 
-                    try:
-                        (submitted_page, submit_mode), submit_source = _click_submit(active_page)
-                    except Exception:
-                        (submitted_page, submit_mode) = (None, None)
-                        submit_source = None
-
-                    if submit_source:
-                        active_page = submitted_page or active_page
-                        logger.info(f"Submitted details via {submit_source} locator; wait_mode={submit_mode}")
-                        try:
-                            active_page.wait_for_load_state('networkidle', timeout=20000)
-                        except Exception:
-                            logger.warning("Load state after submit timed out; continuing")
-                        active_page.wait_for_timeout(800)
+            current_page, upi_waited = _fill_consumer_and_submit(current_page)
 
-                    return active_page
+            (clicked_page, click_source) = (None, None)
+            try:
+                (clicked_page, wait_mode), click_source = _click_pay_by_upi(current_page, upi_waited)
+            except Exception:
+                (clicked_page, wait_mode) = (None, None)
+                click_source = None
 
-                current_page = _fill_consumer_and_submit(current_page)
+            if click_source:
+                target_page = clicked_page or current_page
+                logger.info(f"Clicked 'Pay by UPI' via {click_source} locator; wait_mode={wait_mode}")
 
-                (clicked_page, click_source) = (None, None)
+                # Wait in-page for a QR-like element to render, then for it to
+                # stop animating; the QR itself is the readiness signal, so no
+                # networkidle wait is needed
                 try:
-                    (clicked_page, wait_mode), click_source = _click_pay_by_upi(current_page)
-                except Exception:
-                    (clicked_page, wait_mode) = (None, None)
-                    click_source = None
-
-                if click_source:
-                    target_page = clicked_page or current_page
-                    logger.info(f"Clicked 'Pay by UPI' via {click_source} locator; wait_mode={wait_mode}")
-                    try:
-                        target_page.wait_for_load_state('networkidle', timeout=20000)
-                    except Exception:
-                        logger.warning("Load state after UPI click timed out; proceeding with heuristic wait")
-
-                    # Wait until a QR-like element appears; fall back to fixed delay if not detected
-                    try:
-                        target_page.wait_for_function(
-                            """
-                            () => {
-                                const centerYMin = 0.2, centerYMax = 0.8, centerXMin = 0.2, centerXMax = 0.8;
-                                const viewH = window.innerHeight || 1000;
-                                const viewW = window.innerWidth || 1000;
-
-                                // Look for square-ish imgs/canvas near the center
-                                const candidates = [
-                                    ...document.querySelectorAll('img'),
-                                    ...document.querySelectorAll('canvas')
-                                ];
-
-                                for (const el of candidates) {
-                                    const rect = el.getBoundingClientRect();
-                                    const w = rect.width, h = rect.height;
-                                    if (w < 80 || h < 80) continue;
-                                    const aspect = Math.min(w, h) / Math.max(w, h);
-                                    if (aspect < 0.7) continue; // keep near-square
-
-                                    const cy = (rect.top + rect.bottom) / 2 / viewH;
-                                    const cx = (rect.left + rect.right) / 2 / viewW;
-                                    if (cy < centerYMin || cy > centerYMax || cx < centerXMin || cx > centerXMax) continue;
-
-                                    const src = (el.src || '').toLowerCase();
-                                    const alt = (el.alt || '').toLowerCase();
-                                    const title = (el.title || '').toLowerCase();
-                                    if (src.includes('qr') || src.includes('upi') || alt.includes('qr') || title.includes('qr')) {
-                                        return true;
-                                    }
-                                }
-
-                                return false;
-                            }
-                            """,
-                            timeout=6000
-                        )
+                    qr_el = _wait_for_qr(target_page, 10000)
+                    if qr_el:
+                        qr_el.wait_for_element_state('stable', timeout=3000)
                         logger.info("QR-like element detected after UPI click")
-                    except Exception:
-                        logger.warning("QR heuristic did not resolve in time; using fixed wait")
-                        target_page.wait_for_timeout(4000)
-                else:
-                    logger.warning("'Pay by UPI' button not found; capturing current view")
+                    else:
+                        logger.warning("QR heuristic did not resolve in time; capturing current view")
+                except Exception as e:
+                    logger.warning(f"QR wait failed ({e}); capturing current view")
+            else:
+                logger.warning("'Pay by UPI' button not found; capturing current view")
 
-                # QR now appears near the center; capture a fresh full-page shot after render settle
-                target_page.wait_for_timeout(1200)
-                shot = target_page.screenshot(full_page=True)
-                browser.close()
-                return base64.b64encode(shot).decode('utf-8')
+            # QR now appears near the center; a short settle is only a safety net
+            target_page.wait_for_timeout(200)
+            shot = target_page.screenshot(full_page=True)
+            return base64.b64encode(shot).decode('utf-8')
 
+        # Each attempt gets a fresh context on an already-running pooled browser
+        screenshot_base64 = None
+        async with _qr_capture_slots:
             for attempt in range(2):
                 try:
-                    with sync_playwright() as p:
-                        screenshot_base64 = _shoot(p)
-                        logger.info(f"Screenshot captured successfully (attempt {attempt + 1})")
-                        if screenshot_base64:
-                            return screenshot_base64
+                    screenshot_base64 = await get_qr_browser_pool().run(_shoot)
+                    logger.info(f"Screenshot captured successfully (attempt {attempt + 1})")
+                    break
                 except Exception as e:
                     logger.warning(f"Playwright screenshot attempt {attempt + 1} failed: {e}")
-            logger.error("All Playwright screenshot attempts failed")
-            return None
         
-        try:
-            loop = asyncio.get_event_loop()
-            screenshot_base64 = await loop.run_in_executor(None, _capture_qr)
-            
-            if not screenshot_base64:
-                logger.error("Failed to capture screenshot; no QR will be returned")
-                return None
-            
-            # Per new requirement: when gateway opens, just return the full-page screenshot
-            logger.info("Screenshot captured after UPI flow; returning full page without cropping")
-            return screenshot_base64
-            
-        except Exception as e:
-            logger.error(f"QR capture failed: {e}")
+        if not screenshot_base64:
+            logger.error("Failed to capture screenshot; no QR will be returned")
             return None
-    
-    async def _extract_qr_from_screenshot(self, screenshot_base64: str) -> str:
-        """
-        Use Bedrock Nova Pro vision to extract and crop QR code from screenshot.
-        
-        Args:
-            screenshot_base64: Full page screenshot as base64 string
-            
-        Returns:
-            Cropped QR code region as base64, or original screenshot if QR not found
-        """
-        logger.info("Starting Bedrock QR extraction...")
         
-        try:
-            import json
-            from app.config import settings
-            
-            # Use existing boto3 client setup
-            from botocore.config import Config
-            
-            # Initialize Bedrock client with shorter timeout
-            boto_config = Config(
-                region_name=settings.aws_region,
-                retries={'max_attempts': 2, 'mode': 'standard'},
-                connect_timeout=5,
-                read_timeout=25
-            )
-            
-            client_kwargs = {
-                'service_name': 'bedrock-runtime',
-                'config': boto_config,
-                'region_name': settings.aws_region
-            }
-            
-            if settings.aws_access_key_id and settings.aws_secret_access_key:
-                client_kwargs['aws_access_key_id'] = settings.aws_access_key_id
-                client_kwargs['aws_secret_access_key'] = settings.aws_secret_access_key
-            
-            bedrock_client = boto3.client(**client_kwargs)
-            logger.info("Bedrock client initialized")
-            
-            # Prepare image for Nova Pro (limit size to avoid timeout)
-            # Check if image is too large
-            try:
-                import base64
-                img_bytes = base64.b64decode(screenshot_base64)
-                img_size_mb = len(img_bytes) / (1024 * 1024)
-                logger.info(f"Screenshot size: {img_size_mb:.2f} MB")
-                
-                # If image is too large, skip bedrock and return original
-                if img_size_mb > 5:
-                    logger.warning("Screenshot too large for Bedrock, returning original")
-                    return screenshot_base64
-            except Exception as size_error:
-                logger.warning(f"Error checking image size: {size_error}")
-            
-            # Nova REST payload must be JSON-serializable; send base64 string
-            image_content = {
-                "image": {
-                    "format": "png",
-                    "source": {
-                        "bytes": screenshot_base64
-                    }
-                }
-            }
-            
-            # Ask Nova Pro to locate the QR code using normalized 0-1000 coords with quiet zone
-            prompt_text = (
-                "You are an expert CV assistant for UI element detection. "
-                "Locate the payment UPI QR code (the scannable black-and-white square). Ignore logos or decorative QR-like graphics. "
-                "After clicking the 'Pay by UPI' button, the page refreshes and the QR appears almost dead center in the viewport inside the primary payment panel. Focus on the central QR image, not sidebars or headers. "
-                "Return ONLY one JSON object, no prose: {\"element\":\"qr_code\",\"detected\":true|false,\"bounding_box\":[ymin,xmin,ymax,xmax],\"confidence_score\":0.xx}. "
-                "Coordinates must be normalized 0-1000 where ymin,xmin,ymax,xmax are top-left and bottom-right. "
-                "Include 5-10px of quiet-zone margin inside the image bounds. "
-                "Prefer the QR closest to the visual center if multiple candidates exist. "
-                "If no QR, set detected:false and omit bounding_box."
-            )
-
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        image_content,
-                        {"text": prompt_text}
-                    ]
-                }
-            ]
-            
-            request_body = {
-                "messages": messages,
-                "inferenceConfig": {
-                    "maxTokens": 100,
-                    "temperature": 0
-                }
-            }
-            
-            logger.info("Calling Bedrock Nova Pro...")
-            def invoke_bedrock():
-                return bedrock_client.invoke_model(
-                    modelId="amazon.nova-pro-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(request_body)
-                )
-            
-            response = await asyncio.get_event_loop().run_in_executor(None, invoke_bedrock)
-            response_body = json.loads(response['body'].read())
-            content = response_body.get('output', {}).get('message', {}).get('content', [])
-            
-            if not content:
-                logger.warning("No content in Bedrock response, returning full screenshot")
-                return screenshot_base64
-            
-            response_text = content[0].get('text', '').strip()
-            logger.info(f"Bedrock QR location response: {response_text}")
-            
-            # If QR not found, try direct QR crop via Bedrock before giving up
-            if "NO_QR_FOUND" in response_text.upper():
-                logger.info("No QR code found from coordinates, attempting direct crop via Bedrock")
-                direct = await self._extract_qr_image_direct(bedrock_client, screenshot_base64)
-                return direct if direct else screenshot_base64
-
-            # Try direct extraction first; if it works and is a valid PNG, prefer it over coordinate crop
-            def _is_valid_png(b64_data: str) -> bool:
-                try:
-                    import base64
-                    import io
-                    from PIL import Image
-                    img_bytes = base64.b64decode(b64_data)
-                    if len(img_bytes) < 100:  # too small to be a QR
-                        return False
-                    img = Image.open(io.BytesIO(img_bytes))
-                    img.verify()
-                    return True
-                except Exception:
-                    return False
-
-            direct_qr = await self._extract_qr_image_direct(bedrock_client, screenshot_base64)
-            if direct_qr:
-                if _is_valid_png(direct_qr):
-                    logger.info("Direct QR extraction returned a valid cropped image; using it")
-                    return direct_qr
-                else:
-                    logger.warning("Direct QR extraction returned invalid PNG; falling back to coordinate crop")
-            
-            # Try to parse and crop QR code
-            logger.info("Attempting to crop QR code from screenshot...")
-            cropped = await self._crop_qr_from_response(screenshot_base64, response_text)
-            
-            # If cropping failed (returned original), try direct Bedrock crop once
-            if cropped == screenshot_base64:
-                logger.info("Crop response invalid, attempting direct crop via Bedrock")
-                direct = direct_qr or await self._extract_qr_image_direct(bedrock_client, screenshot_base64)
-                return direct if direct else screenshot_base64
-            
-            return cropped
-            
-        except Exception as e:
-            logger.error(f"Bedrock QR extraction error: {e}", exc_info=True)
-            return screenshot_base64
-    
-    async def _crop_qr_from_response(self, screenshot_base64: str, response_text: str) -> str:
-        """Crop QR code based on Bedrock's position response."""
-        try:
-            from PIL import Image
-            import io
-            import re
-            import json
-
-            # Decode screenshot
-            img_data = base64.b64decode(screenshot_base64)
-            img = Image.open(io.BytesIO(img_data))
-            width, height = img.size
-
-            # Hardcode crop to bottom-left quarter of the page
-            x1 = 0
-            y1 = height // 2
-            x2 = width // 2
-            y2 = height
-
-            # Add modest padding while staying in bounds
-            padding = 12
-            x1 = max(0, x1 - padding)
-            y1 = max(0, y1 - padding)
-            x2 = min(width, x2 + padding)
-            y2 = min(height, y2 + padding)
-
-            logger.info(f"Bottom-left quarter crop: ({x1},{y1})-({x2},{y2}) on {width}x{height}")
-            
-            # Crop image
-            cropped = img.crop((x1, y1, x2, y2))
-            
-            # Convert back to base64
-            buffer = io.BytesIO()
-            cropped.save(buffer, format='PNG')
-            cropped_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-            
-            logger.info("QR code cropped successfully")
-            return cropped_base64
-            
-        except Exception as crop_error:
-            logger.error(f"Error cropping QR code: {crop_error}", exc_info=True)
-            return screenshot_base64
-
-    async def _extract_qr_image_direct(self, bedrock_client, screenshot_base64: str) -> Optional[str]:
-        """Ask Bedrock to return a cropped QR image directly as base64 PNG."""
-        try:
-            import json
-            import base64
-            import io
-            from PIL import Image
-            
-            image_content = {
-                "image": {
-                    "format": "png",
-                    "source": {
-                        "bytes": screenshot_base64
-                    }
-                }
-            }
-
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        image_content,
-                        {
-                            "text": (
-                                "Extract ONLY the QR code region from this payment page. "
-                                "Return a strict JSON object with a single field qr_base64_png containing the base64 PNG of the cropped QR. "
-                                "Format: {\"qr_base64_png\": \"<base64_png>\"}. "
-                                "Do NOT include markdown, code fences, or any explanation. "
-                                "If no QR is present, return NO_QR_FOUND."
-                            )
-                        }
-                    ]
-                }
-            ]
-
-            request_body = {
-                "messages": messages,
-                "inferenceConfig": {
-                    "maxTokens": 400,
-                    "temperature": 0
-                }
-            }
-
-            def invoke_bedrock():
-                return bedrock_client.invoke_model(
-                    modelId="amazon.nova-pro-v1:0",
-                    contentType="application/json",
-                    accept="application/json",
-                    body=json.dumps(request_body)
-                )
-
-            response = await asyncio.get_event_loop().run_in_executor(None, invoke_bedrock)
-            response_body = json.loads(response['body'].read())
-            content = response_body.get('output', {}).get('message', {}).get('content', [])
-
-            if not content:
-                logger.warning("Direct QR extraction returned empty content")
-                return None
-
-            response_text = content[0].get('text', '').strip()
-            if "NO_QR_FOUND" in response_text.upper():
-                logger.info("Direct QR extraction reported NO_QR_FOUND")
-                return None
-
-            def _is_valid_png(b64_data: str) -> bool:
-                try:
-                    img_bytes = base64.b64decode(b64_data)
-                    if len(img_bytes) < 100:
-                        return False
-                    img = Image.open(io.BytesIO(img_bytes))
-                    img.verify()
-                    return True
-                except Exception:
-                    return False
-
-            try:
-                parsed = json.loads(response_text)
-                qr_b64 = parsed.get("qr_base64_png")
-                if qr_b64:
-                    if _is_valid_png(qr_b64):
-                        logger.info("Direct QR extraction succeeded")
-                        return qr_b64
-                    logger.warning("Direct QR extraction JSON PNG invalid")
-            except Exception as parse_err:
-                logger.warning(f"Failed to parse direct QR response: {parse_err}")
-
-            # Fallback parsing: extract base64-looking string from response text
-            try:
-                import re
-                m = re.search(r'"qr_base64_png"\s*:\s*"([A-Za-z0-9+/=]+)"', response_text)
-                if m:
-                    candidate = m.group(1)
-                    if _is_valid_png(candidate):
-                        logger.info("Direct QR extraction parsed via JSON regex")
-                        return candidate
-                    logger.warning("Direct QR extraction regex PNG invalid")
-
-                # Generic long base64 blob (avoid tiny matches)
-                m = re.search(r'([A-Za-z0-9+/=]{200,})', response_text)
-                if m:
-                    candidate = m.group(1)
-                    if _is_valid_png(candidate):
-                        logger.info("Direct QR extraction parsed via base64 fallback")
-                        return candidate
-                    logger.warning("Direct QR extraction base64 fallback invalid")
-            except Exception as fallback_err:
-                logger.warning(f"Fallback parse for direct QR failed: {fallback_err}")
-
-            logger.warning("Direct QR extraction did not return usable base64")
-            return None
-
-        except Exception as e:
-            logger.error(f"Direct QR extraction error: {e}", exc_info=True)
-            return None
+        # Per new requirement: when gateway opens, just return the full-page screenshot
+        logger.info("Screenshot captured after UPI flow; returning full page without cropping")
+        return screenshot_base64
 
 
 class UtilityNavigator:
@@ -1868,7 +1602,9 @@ class UtilityNavigator:
     
     def __init__(self):
         self.browser_agent = AgentCoreBrowserAgent()
-        self.active_sessions: Dict[str, NavigationSession] = {}
+        self.active_sessions: "OrderedDict[str, NavigationSession]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._reaper: Optional[asyncio.Task] = None
         
         self.url_map = {
             ServiceType.KSEB: settings.kseb_url,
@@ -1937,6 +1673,29 @@ Navigate the K-Smart (Municipal Services) portal:
         Returns:
             ScrapedData with bill information and historical data
         """
+        # Concurrent requests for the same account (e.g. the bill card and the
+        # history chart loading together) share one session and parse
+        key = (service_type, consumer_id, number_plate)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._fetch_bill_data(service_type, consumer_id, number_plate))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(functools.partial(self._forget_inflight, key))
+        
+        # Shield so one cancelled caller does not abort the shared fetch
+        return await asyncio.shield(inflight)
+    
+    def _forget_inflight(self, key: tuple, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # Mark retrieved even if every caller went away
+    
+    async def _fetch_bill_data(
+        self,
+        service_type: ServiceType,
+        consumer_id: str,
+        number_plate: Optional[str]
+    ) -> ScrapedData:
         session_id = str(uuid.uuid4())
         session = NavigationSession(
             session_id=session_id,
@@ -1944,6 +1703,10 @@ Navigate the K-Smart (Municipal Services) portal:
             consumer_id=consumer_id
         )
         self.active_sessions[session_id] = session
+        while len(self.active_sessions) > _MAX_TRACKED_SESSIONS:
+            self.active_sessions.popitem(last=False)
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_sessions())
         
         url = self.url_map[service_type]
         instructions = self.service_instructions[service_type]
@@ -1958,65 +1721,64 @@ Navigate the K-Smart (Municipal Services) portal:
                 number_plate=number_plate
             )
 
-            if not isinstance(extracted, dict):
-                raise ValueError("Extraction result is not a valid object")
-
-            if "consumer_name" not in extracted or "amount_due" not in extracted:
-                raise ValueError("Extraction missing required bill fields")
+            # A non-dict result or missing field surfaces as TypeError/KeyError here
+            try:
+                consumer_name = extracted['consumer_name']
+                amount_due = extracted['amount_due']
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Extraction missing required bill fields: {e!r}") from None
             
-            # Parse historical billing data
+            # Parse historical billing data; a malformed entry only skips that item
             history_list = []
-            raw_history = extracted.get('history', [])
-            if raw_history and isinstance(raw_history, list):
-                logger.info(f"Processing {len(raw_history)} historical bills")
-                import re
-                for hist_item in raw_history:
-                    try:
-                        # Parse amount - remove currency symbols and commas
-                        amount_str = str(hist_item.get('amount', '0'))
-                        amount_clean = re.sub(r'[₹$Rs\s]', '', amount_str)
-                        amount_clean = amount_clean.replace(',', '')
-                        hist_amount = float(amount_clean)
-                        
-                        # Parse units if present
-                        units_str = hist_item.get('units')
-                        hist_units = None
-                        if units_str:
-                            try:
-                                units_clean = re.sub(r'[^\d.]', '', str(units_str))
-                                hist_units = float(units_clean) if units_clean else None
-                            except:
-                                pass
-                        
-                        # Determine status
-                        status_str = str(hist_item.get('status', '')).lower()
-                        if 'paid' in status_str or 'settled' in status_str:
-                            hist_status = PaymentStatus.PAID
-                        elif 'pending' in status_str:
-                            hist_status = PaymentStatus.PENDING
-                        else:
-                            hist_status = PaymentStatus.UNPAID
-                        
-                        # Create BillingHistory object
-                        history_list.append(BillingHistory(
-                            account_id=f"{service_type.value}_{consumer_id}",
-                            date=hist_item.get('date', ''),
-                            amount=hist_amount,
-                            units=hist_units,
-                            status=hist_status
-                        ))
-                    except Exception as e:
-                        logger.warning(f"Failed to parse history item: {e}")
-                        continue
-                
+            raw_history = extracted.get('history')
+            for hist_item in raw_history if isinstance(raw_history, list) else ():
+                try:
+                    # Parse amount - first number in the cell, commas dropped
+                    amount_match = _HISTORY_AMOUNT_RE.search(str(hist_item.get('amount', '0')))
+                    if not amount_match:
+                        raise ValueError(f"No amount in {hist_item.get('amount')!r}")
+                    hist_amount = float(amount_match[1] + amount_match[2].replace(',', ''))
+                    
+                    # Parse units if present
+                    units_str = hist_item.get('units')
+                    hist_units = None
+                    if units_str:
+                        try:
+                            units_clean = str(units_str).translate(_UNITS_STRIP)
+                            if not units_clean.isascii():
+                                units_clean = _UNITS_STRIP_RE.sub('', units_clean)
+                            hist_units = float(units_clean) if units_clean else None
+                        except:
+                            pass
+                    
+                    # Determine status
+                    status_match = _HISTORY_STATUS_RE.search(str(hist_item.get('status', '')))
+                    hist_status = (
+                        _HISTORY_STATUS_MAP[status_match[1].lower()] if status_match
+                        else PaymentStatus.UNPAID
+                    )
+                    
+                    # Create BillingHistory object
+                    history_list.append(BillingHistory(
+                        account_id=f"{service_type.value}_{consumer_id}",
+                        date=hist_item.get('date', ''),
+                        amount=hist_amount,
+                        units=hist_units,
+                        status=hist_status
+                    ))
+                except Exception as e:
+                    logger.warning(f"Failed to parse history item: {e}")
+                    continue
+            
+            if history_list:
                 logger.info(f"Successfully parsed {len(history_list)} historical bills")
             
             # Convert to ScrapedData
-            amount = float(extracted.get('amount_due'))
+            amount = float(amount_due)
             status = PaymentStatus.UNPAID if amount > 0 else PaymentStatus.PAID
             
             scraped_data = ScrapedData(
-                consumer_name=extracted.get('consumer_name'),
+                consumer_name=consumer_name,
                 amount_due=amount,
                 status=status,
                 additional_info={
@@ -2038,12 +1800,33 @@ Navigate the K-Smart (Municipal Services) portal:
             logger.error(f"Bill fetch failed: {e}")
             session.status = "failed"
             raise
-        finally:
-            # Cleanup session after delay
-            asyncio.get_event_loop().call_later(
-                300,
-                lambda: self.active_sessions.pop(session_id, None)
-            )
+        except BaseException:
+            # Cancelled mid-fetch: mark it finished so the reaper can collect it
+            session.status = "failed"
+            raise
+    
+    async def _reap_sessions(self) -> None:
+        """
+        Periodically drop finished sessions older than the retention window,
+        and any session older than the hard age cap.
+
+        Exits once no sessions are tracked; _fetch_bill_data starts a new one
+        on demand.
+        """
+        while self.active_sessions:
+            await asyncio.sleep(_SESSION_REAP_INTERVAL_SECONDS)
+            now = datetime.utcnow()
+            cutoff = now - timedelta(seconds=_SESSION_RETENTION_SECONDS)
+            abandoned_cutoff = now - timedelta(seconds=_SESSION_MAX_AGE_SECONDS)
+            # Sessions are kept in start order, so stop at the first one inside the window
+            stale = []
+            for session_id, session in self.active_sessions.items():
+                if session.started_at >= cutoff:
+                    break
+                if session.status != "active" or session.started_at < abandoned_cutoff:
+                    stale.append(session_id)
+            for session_id in stale:
+                self.active_sessions.pop(session_id, None)
     
     async def navigate_to_payment(
         self, 
@@ -2059,14 +1842,21 @@ Navigate the K-Smart (Municipal Services) portal:
         url = self.url_map[service_type]
         
         logger.info(f"Starting payment navigation for {service_type.value}: {consumer_id}")
+        await self.invalidate_bill_cache(service_type, consumer_id)
         
         try:
             qr_data = await self.browser_agent.capture_qr_code(url, consumer_id)
             return qr_data
+        except QRCaptureBusyError:
+            raise
         except Exception as e:
             logger.error(f"Payment navigation failed: {e}")
             return None
     
+    async def invalidate_bill_cache(self, service_type: ServiceType, consumer_id: str) -> None:
+        """Forget cached bill results for an account whose payment state is changing."""
+        await _bill_result_cache.invalidate(self.url_map[service_type], consumer_id)
+    
     async def fetch_billing_history(
         self, 
         service_type: ServiceType, 
@@ -2080,7 +1870,8 @@ Navigate the K-Smart (Municipal Services) portal:
         """
         logger.info(f"Fetching billing history for {service_type.value}: {consumer_id}")
 
-        # Reuse bill fetch path to avoid fabricated data; return real history only if present
+        # Reuse bill fetch path to avoid fabricated data; return real history only if present.
+        # A bill fetch already running for this account is joined rather than repeated.
         try:
             scraped = await self.fetch_bill_data(service_type=service_type, consumer_id=consumer_id)
             return scraped.history or []
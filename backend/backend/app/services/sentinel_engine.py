@@ -8,20 +8,26 @@ Provides:
 - Automated MVD email generation
 """
 
-import base64
-import json
 import logging
 import asyncio
-from typing import Optional, Tuple
+import smtplib
+import ssl
+import string
+from typing import Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import wraps
 from io import BytesIO
 
 import boto3
+import orjson
 from botocore.config import Config
-from botocore.exceptions import ClientError, BotoCoreError
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
+from botocore.exceptions import (
+    ClientError, BotoCoreError, ConnectTimeoutError, ReadTimeoutError,
+    EndpointConnectionError, ConnectionClosedError,
+)
+from PIL import Image, ImageOps
+from PIL.ExifTags import GPSTAGS
 
 from app.config import settings
 
@@ -33,9 +39,117 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Dedicated worker pools so ANPR and email calls don't queue behind the rest of
+# the app's blocking work on the loop's default executor
+_BEDROCK_WORKERS = 16
+_EMAIL_WORKERS = 4
+
+# SES API failures that guarantee the message was never accepted, so resending
+# over SMTP cannot duplicate the report. Read timeouts are deliberately absent.
+_SES_REJECTION_CODES = frozenset({
+    'AccessDenied',
+    'AccessDeniedException',
+    'UnrecognizedClientException',
+    'InvalidClientTokenId',
+    'SignatureDoesNotMatch',
+    'MessageRejected',
+    'MailFromDomainNotVerifiedException',
+    'AccountSuspendedException',
+    'SendingPausedException',
+    'TooManyRequestsException',
+})
+
+# Built once: loading the CA bundle per SMTP send costs file I/O on every email
+_SMTP_SSL_CONTEXT = ssl.create_default_context()
+
+# EXIF tag ids read by extract_exif_data (Make lives in IFD0, the rest in sub-IFDs)
+_EXIF_MAKE = 0x010F
+_EXIF_IFD = 0x8769
+_EXIF_DATETIME_ORIGINAL = 0x9003
+_EXIF_GPS_IFD = 0x8825
+
+# The copy of an evidence image sent for analysis is capped to Bedrock's
+# recommended vision input size; the original is stored and emailed as uploaded
+_VISION_MAX_SIDE = 1568
+_VISION_JPEG_QUALITY = 85
+
+# MVD report bodies; only the report fields change between emails
+_MVD_BODY_TMPL = string.Template("""To,
+The Motor Vehicles Department,
+Government of Kerala
+
+Subject: $subject
+
+Respected Sir/Madam,
+
+I wish to report a traffic violation observed with the following details:
+
+**Vehicle Number:** $plate
+**Violation Type:** $violation
+**Date & Time:** $timestamp
+**Location:** $location
+
+**Description:**
+$description
+
+**Evidence:** Attached photograph
+
+I request you to take appropriate action against the violator as per the Motor Vehicles Act.
+
+Thank you.
+
+Yours faithfully,
+OneWay Citizen Reporter
+(Auto-generated report via OneWay Sentinel)
+""")
+
+_MVD_HTML_TMPL = string.Template("""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <h2 style="color: #d97706;">Traffic Violation Report</h2>
+            <div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                <p><strong>Vehicle Number:</strong> $plate</p>
+                <p><strong>Violation Type:</strong> $violation</p>
+                <p><strong>Date & Time:</strong> $timestamp</p>
+                <p><strong>Location:</strong> $location</p>
+            </div>
+            <h3>Description:</h3>
+            <p style="background: #fff3cd; padding: 15px; border-radius: 8px;">
+                $description
+            </p>
+            <p><strong>Evidence:</strong> See attached photograph</p>
+            <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
+            <p style="color: #666; font-size: 12px;">
+                This is an auto-generated report via OneWay Sentinel.<br>
+                Report ID: $report_id
+            </p>
+        </body>
+        </html>
+        """)
+
+
+# Bedrock failures worth another attempt; anything else fails on the first try
+_TRANSIENT_ERROR_CODES = frozenset({
+    'ThrottlingException',
+    'ServiceUnavailableException',
+    'ModelTimeoutException',
+    'ModelNotReadyException',
+    'InternalServerException',
+})
+_TRANSIENT_CONNECTION_ERRORS = (
+    ConnectTimeoutError, ReadTimeoutError, EndpointConnectionError, ConnectionClosedError,
+    asyncio.TimeoutError,
+)
+
+
+def _is_transient(error: BaseException) -> bool:
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code') in _TRANSIENT_ERROR_CODES
+    return isinstance(error, _TRANSIENT_CONNECTION_ERRORS)
+
 
 def async_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0):
-    """Decorator for async retry with exponential backoff."""
+    """Decorator for async retry with exponential backoff, on transient errors only."""
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
@@ -45,7 +159,9 @@ def async_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0)
             for attempt in range(max_attempts):
                 try:
                     return await func(*args, **kwargs)
-                except (ClientError, BotoCoreError, Exception) as e:
+                except (ClientError, BotoCoreError, asyncio.TimeoutError) as e:
+                    if not _is_transient(e):
+                        raise
                     last_exception = e
                     if attempt < max_attempts - 1:
                         logger.warning(f"Attempt {attempt + 1}/{max_attempts} failed: {e}. Retrying in {current_delay}s...")
@@ -66,7 +182,11 @@ class SentinelEngine:
     def __init__(self):
         config = Config(
             region_name=settings.aws_region,
-            retries={'max_attempts': 3, 'mode': 'adaptive'}
+            retries={'max_attempts': 3, 'mode': 'adaptive'},
+            connect_timeout=settings.bedrock_connect_timeout,
+            read_timeout=settings.bedrock_read_timeout,
+            max_pool_connections=_BEDROCK_WORKERS,
+            tcp_keepalive=True,
         )
         self.bedrock = boto3.client(
             service_name='bedrock-runtime',
@@ -75,9 +195,23 @@ class SentinelEngine:
             aws_secret_access_key=settings.aws_secret_access_key,
         )
         self.model_id = settings.bedrock_model_id  # Use Nova Pro from settings
+        # SES over its HTTPS API keeps pooled keep-alive connections, unlike a
+        # fresh SMTP connect + STARTTLS + AUTH for every report
+        self.ses = boto3.client(
+            service_name='sesv2',
+            config=Config(
+                region_name=settings.aws_region,
+                max_pool_connections=_EMAIL_WORKERS,
+                tcp_keepalive=True,
+            ),
+            aws_access_key_id=settings.aws_access_key_id,
+            aws_secret_access_key=settings.aws_secret_access_key,
+        )
+        self._bedrock_pool = ThreadPoolExecutor(max_workers=_BEDROCK_WORKERS, thread_name_prefix='bedrock')
+        self._email_pool = ThreadPoolExecutor(max_workers=_EMAIL_WORKERS, thread_name_prefix='email')
     
-    def _detect_media_type(self, image_data: bytes) -> str:
-        """Detect image media type from magic bytes."""
+    def _detect_media_type(self, image_data: Union[bytes, memoryview]) -> str:
+        """Detect image media type from magic bytes (a memoryview avoids slice copies)."""
         if image_data[:8] == b'\x89PNG\r\n\x1a\n':
             return 'image/png'
         elif image_data[:2] == b'\xff\xd8':
@@ -100,51 +234,104 @@ class SentinelEngine:
             "device": None
         }
         
+        # GIF has no EXIF block; skip opening it at all. PNG can carry one in eXIf.
+        if self._detect_media_type(memoryview(image_bytes)) == 'image/gif':
+            return result
+        
         try:
-            image = Image.open(BytesIO(image_bytes))
-            exif_data = image._getexif()
-            
-            if not exif_data:
-                return result
-            
-            # Extract basic EXIF tags
-            for tag_id, value in exif_data.items():
-                tag = TAGS.get(tag_id, tag_id)
+            with Image.open(BytesIO(image_bytes)) as image:
+                # getexif() parses only the EXIF IFDs, without rebuilding the legacy flat dict
+                exif_data = image.getexif()
+                if not exif_data:
+                    return result
+                
+                result["device"] = exif_data.get(_EXIF_MAKE)
+                result["timestamp"] = exif_data.get_ifd(_EXIF_IFD).get(_EXIF_DATETIME_ORIGINAL)
+                
+                gps_info = {
+                    GPSTAGS.get(gps_tag_id, gps_tag_id): gps_value
+                    for gps_tag_id, gps_value in exif_data.get_ifd(_EXIF_GPS_IFD).items()
+                }
                 
-                if tag == "DateTimeOriginal":
-                    result["timestamp"] = value
-                elif tag == "Make":
-                    result["device"] = value
-                elif tag == "GPSInfo":
-                    gps_info = {}
-                    for gps_tag_id, gps_value in value.items():
-                        gps_tag = GPSTAGS.get(gps_tag_id, gps_tag_id)
-                        gps_info[gps_tag] = gps_value
+                # Parse GPS coordinates
+                if "GPSLatitude" in gps_info and "GPSLongitude" in gps_info:
+                    lat = self._convert_to_degrees(gps_info["GPSLatitude"])
+                    lon = self._convert_to_degrees(gps_info["GPSLongitude"])
                     
-                    # Parse GPS coordinates
-                    if "GPSLatitude" in gps_info and "GPSLongitude" in gps_info:
-                        lat = self._convert_to_degrees(gps_info["GPSLatitude"])
-                        lon = self._convert_to_degrees(gps_info["GPSLongitude"])
-                        
-                        if gps_info.get("GPSLatitudeRef") == "S":
-                            lat = -lat
-                        if gps_info.get("GPSLongitudeRef") == "W":
-                            lon = -lon
-                        
-                        result["latitude"] = lat
-                        result["longitude"] = lon
-                        result["location_string"] = f"{lat:.6f}, {lon:.6f}"
+                    if gps_info.get("GPSLatitudeRef") == "S":
+                        lat = -lat
+                    if gps_info.get("GPSLongitudeRef") == "W":
+                        lon = -lon
+                    
+                    result["latitude"] = lat
+                    result["longitude"] = lon
+                    result["location_string"] = f"{lat:.6f}, {lon:.6f}"
         except Exception as e:
             logger.warning(f"EXIF extraction failed: {e}")
         
         return result
     
+    def _shrink_image(self, image_bytes: bytes) -> bytes:
+        """Downscale to the vision size cap and re-encode as JPEG; returns the input if that saves nothing."""
+        try:
+            with Image.open(BytesIO(image_bytes)) as image:
+                if image.format == 'JPEG' and max(image.size) <= _VISION_MAX_SIDE:
+                    return image_bytes
+                # Bake in the EXIF rotation, since the re-encoded copy carries no EXIF
+                image = ImageOps.exif_transpose(image)
+                image.thumbnail((_VISION_MAX_SIDE, _VISION_MAX_SIDE), Image.LANCZOS)
+                buffer = BytesIO()
+                image.convert('RGB').save(buffer, format='JPEG', quality=_VISION_JPEG_QUALITY, optimize=True)
+        except Exception as e:
+            logger.warning(f"Image optimization failed, using original: {e}")
+            return image_bytes
+        
+        shrunk = buffer.getvalue()
+        return shrunk if len(shrunk) < len(image_bytes) else image_bytes
+    
+    async def optimize_for_vision(self, image_bytes: bytes) -> bytes:
+        """
+        Shrink an uploaded image before it is sent for analysis.
+        
+        Read EXIF from the original upload: the optimized copy has none.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self._bedrock_pool, self._shrink_image, image_bytes)
+    
     def _convert_to_degrees(self, value) -> float:
         """Convert GPS coordinates to decimal degrees."""
         d, m, s = value
+        if hasattr(d, 'numerator'):
+            # IFDRational: divide the raw ints instead of going through __float__
+            try:
+                return (
+                    d.numerator / d.denominator
+                    + m.numerator / (m.denominator * 60)
+                    + s.numerator / (s.denominator * 3600)
+                )
+            except ZeroDivisionError:
+                pass  # A 0 denominator; float() maps it to nan as before
         return float(d) + float(m) / 60 + float(s) / 3600
     
     @async_retry(max_attempts=3, delay=1.0)
+    async def _converse_text(self, messages: list) -> str:
+        """Run a Bedrock Converse call and return the first content block's text."""
+        loop = asyncio.get_event_loop()
+        response = await loop.run_in_executor(
+            self._bedrock_pool,
+            lambda: self.bedrock.converse(
+                modelId=self.model_id,
+                messages=messages,
+                inferenceConfig={"maxTokens": 1024, "temperature": 0.1}
+            )
+        )
+        
+        content_list = response.get('output', {}).get('message', {}).get('content', [])
+        if not content_list:
+            raise RuntimeError("Empty response from Bedrock")
+        
+        return content_list[0].get('text', '')
+    
     async def analyze_violation(self, image_bytes: bytes) -> dict:
         """
         Analyze image for traffic violations using Bedrock Vision.
@@ -159,8 +346,6 @@ class SentinelEngine:
                 "description": str      # Formal description for MVD
             }
         """
-        image_b64 = base64.b64encode(image_bytes).decode('utf-8')
-        
         prompt = """Analyze this traffic violation image carefully.
 
 1. **License Plate Recognition (ANPR)**: Extract the vehicle's license plate number. Use standard Indian format (e.g., KL 01 AB 1234).
@@ -191,10 +376,11 @@ Return ONLY valid JSON (no markdown):
 }"""
 
         # Detect image format
-        media_type = self._detect_media_type(image_bytes)
+        media_type = self._detect_media_type(memoryview(image_bytes))
         img_format = media_type.split('/')[-1]
 
-        # Nova Pro message format
+        # Converse takes the raw image bytes; the request is built once and only
+        # the Bedrock call itself is retried
         messages = [
             {
                 "role": "user",
@@ -203,7 +389,7 @@ Return ONLY valid JSON (no markdown):
                         "image": {
                             "format": img_format,
                             "source": {
-                                "bytes": image_b64
+                                "bytes": image_bytes
                             }
                         }
                     },
@@ -213,38 +399,8 @@ Return ONLY valid JSON (no markdown):
                 ]
             }
         ]
-
-        # Nova Pro request format
-        body = json.dumps({
-            "messages": messages,
-            "inferenceConfig": {
-                "maxTokens": 1024,
-                "temperature": 0.1
-            }
-        })
-        
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=body,
-                contentType="application/json",
-                accept="application/json"
-            )
-        )
         
-        response_body = json.loads(response['body'].read())
-        
-        # Nova Pro response format: output.message.content[0].text
-        output = response_body.get('output', {})
-        message = output.get('message', {})
-        content_list = message.get('content', [])
-        
-        if not content_list:
-            raise RuntimeError("Empty response from Bedrock")
-        
-        content = content_list[0].get('text', '')
+        content = await self._converse_text(messages)
         
         # Parse JSON from response
         try:
@@ -253,8 +409,8 @@ Return ONLY valid JSON (no markdown):
                 content = content.split("```")[1]
                 if content.startswith("json"):
                     content = content[4:]
-            result = json.loads(content.strip())
-        except json.JSONDecodeError:
+            result = orjson.loads(content.strip())
+        except orjson.JSONDecodeError:
             logger.error(f"Failed to parse AI response: {content}")
             result = {
                 "plate": None,
@@ -267,6 +423,20 @@ Return ONLY valid JSON (no markdown):
         
         return result
     
+    async def process_violation(self, image_bytes: bytes) -> Tuple[dict, dict]:
+        """
+        Read EXIF from the original upload while a shrunk copy is analyzed.
+        
+        Returns:
+            (EXIF data, analysis)
+        """
+        loop = asyncio.get_event_loop()
+        # extract_exif_data never raises, so the future is safe to leave pending on error
+        exif_future = loop.run_in_executor(self._bedrock_pool, self.extract_exif_data, image_bytes)
+        optimized = await self.optimize_for_vision(image_bytes)
+        analysis = await self.analyze_violation(optimized)
+        return await exif_future, analysis
+    
     def generate_mvd_email(self, analysis: dict, exif_data: dict, image_bytes: bytes) -> dict:
         """
         Generate formatted email content for MVD submission.
@@ -276,34 +446,14 @@ Return ONLY valid JSON (no markdown):
         
         subject = f"Traffic Violation Report - {analysis.get('plate', 'Unknown Vehicle')}"
         
-        body = f"""To,
-The Motor Vehicles Department,
-Government of Kerala
-
-Subject: {subject}
-
-Respected Sir/Madam,
-
-I wish to report a traffic violation observed with the following details:
-
-**Vehicle Number:** {analysis.get('plate', 'Not clearly visible')}
-**Violation Type:** {analysis.get('violation', 'Traffic violation')}
-**Date & Time:** {timestamp}
-**Location:** {location}
-
-**Description:**
-{analysis.get('description', 'Traffic violation observed.')}
-
-**Evidence:** Attached photograph
-
-I request you to take appropriate action against the violator as per the Motor Vehicles Act.
-
-Thank you.
-
-Yours faithfully,
-OneWay Citizen Reporter
-(Auto-generated report via OneWay Sentinel)
-"""
+        body = _MVD_BODY_TMPL.substitute(
+            subject=subject,
+            plate=analysis.get('plate', 'Not clearly visible'),
+            violation=analysis.get('violation', 'Traffic violation'),
+            timestamp=timestamp,
+            location=location,
+            description=analysis.get('description', 'Traffic violation observed.'),
+        )
         
         return {
             "to": settings.sentinel_recipient_email,
@@ -321,8 +471,11 @@ OneWay Citizen Reporter
     ) -> dict:
         """
         Send violation report email with image attachment via AWS SES.
+        
+        Uses the SES v2 API (SendEmail with raw content), falling back to SES SMTP
+        when the API call fails and SMTP credentials are configured.
         """
-        import email
+        from email import policy
         from email.mime.multipart import MIMEMultipart
         from email.mime.text import MIMEText
         from email.mime.image import MIMEImage
@@ -344,29 +497,14 @@ OneWay Citizen Reporter
         msg_body.attach(text_part)
         
         # HTML version
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-            <h2 style="color: #d97706;">Traffic Violation Report</h2>
-            <div style="background: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                <p><strong>Vehicle Number:</strong> {analysis.get('plate', 'Not clearly visible')}</p>
-                <p><strong>Violation Type:</strong> {analysis.get('violation', 'Traffic violation')}</p>
-                <p><strong>Date & Time:</strong> {exif_data.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                <p><strong>Location:</strong> {exif_data.get('location_string') or 'Location not available'}</p>
-            </div>
-            <h3>Description:</h3>
-            <p style="background: #fff3cd; padding: 15px; border-radius: 8px;">
-                {analysis.get('description', 'Traffic violation observed.')}
-            </p>
-            <p><strong>Evidence:</strong> See attached photograph</p>
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 30px 0;">
-            <p style="color: #666; font-size: 12px;">
-                This is an auto-generated report via OneWay Sentinel.<br>
-                Report ID: {report_id}
-            </p>
-        </body>
-        </html>
-        """
+        html_body = _MVD_HTML_TMPL.substitute(
+            plate=analysis.get('plate', 'Not clearly visible'),
+            violation=analysis.get('violation', 'Traffic violation'),
+            timestamp=exif_data.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            location=exif_data.get('location_string') or 'Location not available',
+            description=analysis.get('description', 'Traffic violation observed.'),
+            report_id=report_id,
+        )
         html_part = MIMEText(html_body, 'html', 'utf-8')
         msg_body.attach(html_part)
         msg.attach(msg_body)
@@ -381,51 +519,65 @@ OneWay Citizen Reporter
         img_attachment.add_header('Content-ID', '<violation_image>')
         msg.attach(img_attachment)
         
+        # Serialize (and base64 the attachment) once, with CRLF line endings SMTP expects
+        serialized = msg.as_bytes(policy=policy.SMTP)
+        loop = asyncio.get_event_loop()
+        
         try:
-            import smtplib
-            import ssl
-            
-            # Validate SMTP credentials are configured
-            if not settings.ses_smtp_username or not settings.ses_smtp_password:
-                raise ValueError("SES SMTP credentials not configured. Set SES_SMTP_USERNAME and SES_SMTP_PASSWORD in .env")
-            
-            # Send via SES SMTP
-            context = ssl.create_default_context()
-            
-            def send_smtp():
-                with smtplib.SMTP(settings.ses_smtp_host, settings.ses_smtp_port) as server:
-                    server.starttls(context=context)
-                    server.login(settings.ses_smtp_username, settings.ses_smtp_password)
-                    server.sendmail(
-                        settings.sentinel_sender_email,
-                        [settings.sentinel_recipient_email],
-                        msg.as_string()
+            try:
+                response = await loop.run_in_executor(
+                    self._email_pool,
+                    lambda: self.ses.send_email(
+                        FromEmailAddress=settings.sentinel_sender_email,
+                        Destination={'ToAddresses': [settings.sentinel_recipient_email]},
+                        Content={'Raw': {'Data': serialized}}
                     )
-                return True
-            
-            await asyncio.get_event_loop().run_in_executor(None, send_smtp)
+                )
+                message_id = response['MessageId']
+                logger.info(f"Email sent successfully via SES to {settings.sentinel_recipient_email}")
+            except (ClientError, ConnectTimeoutError, EndpointConnectionError) as e:
+                # Deployments that only hold SES SMTP credentials keep working, but only
+                # fall back when SES definitely did not take the message
+                rejected = (
+                    not isinstance(e, ClientError)
+                    or e.response.get('Error', {}).get('Code') in _SES_REJECTION_CODES
+                )
+                if not rejected or not settings.ses_smtp_username or not settings.ses_smtp_password:
+                    raise
+                logger.warning(f"SES API send failed ({e}), falling back to SES SMTP")
+                await loop.run_in_executor(self._email_pool, self._send_smtp, serialized)
+                message_id = f"smtp_{report_id}"
+                logger.info(f"Email sent successfully via SES SMTP to {settings.sentinel_recipient_email}")
             
-            logger.info(f"Email sent successfully via SES SMTP to {settings.sentinel_recipient_email}")
             return {
                 "success": True,
-                "message_id": f"smtp_{report_id}",
+                "message_id": message_id,
                 "recipient": settings.sentinel_recipient_email
             }
             
         except Exception as e:
-            logger.error(f"Failed to send email via SES SMTP: {e}")
+            logger.error(f"Failed to send email via SES: {e}")
             return {
                 "success": False,
                 "error": str(e),
-                "note": "SES SMTP failed. Check SMTP credentials and verify sender email in SES console."
+                "note": "SES send failed. Check AWS credentials (or SES SMTP credentials) and verify sender email in SES console."
             }
     
+    def _send_smtp(self, serialized: bytes) -> None:
+        """Blocking send of an already-serialized message over SES SMTP."""
+        with smtplib.SMTP(settings.ses_smtp_host, settings.ses_smtp_port) as server:
+            server.starttls(context=_SMTP_SSL_CONTEXT)
+            server.login(settings.ses_smtp_username, settings.ses_smtp_password)
+            server.sendmail(
+                settings.sentinel_sender_email,
+                [settings.sentinel_recipient_email],
+                serialized
+            )
+    
     async def _send_email_smtp(self, msg, email_content: dict) -> dict:
         """
         Fallback SMTP email sending (for local testing).
         """
-        import smtplib
-        
         try:
             # For demo purposes, just log that email would be sent
             logger.info(f"SMTP Fallback - Would send to: {email_content['to']}")